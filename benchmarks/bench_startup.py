@@ -0,0 +1,27 @@
+""" Measures PhreeqPython start-up time with and without the database cache
+
+    python benchmarks/bench_startup.py [database] [repeat]
+"""
+
+import sys
+import timeit
+
+from phreeqpython import PhreeqPython
+
+def construct(cache_database):
+    pp = PhreeqPython(database=database, cache_database=cache_database)
+    pp.add_solution_simple({'NaCl': 1})
+    pp.close()
+
+if __name__ == '__main__':
+    database = sys.argv[1] if len(sys.argv) > 1 else 'vitens.dat'
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+    uncached = timeit.timeit(lambda: construct(False), number=repeat) / repeat
+    construct(True)
+    cached = timeit.timeit(lambda: construct(True), number=repeat) / repeat
+
+    print("database:  %s" % database)
+    print("uncached:  %.3f ms" % (uncached * 1e3))
+    print("cached:    %.3f ms" % (cached * 1e3))
+    print("speed-up:  %.0fx" % (uncached / cached))
@@ -0,0 +1,21 @@
+import os
+
+import pytest
+
+from phreeqpython import PhreeqPython
+
+def pytest_generate_tests(metafunc):
+    # number of solutions per benchmark, e.g. PHREEQPYTHON_BENCH_SIZES=1,1000,100000
+    if 'size' in metafunc.fixturenames:
+        sizes = os.environ.get('PHREEQPYTHON_BENCH_SIZES', '1,100,1000')
+        metafunc.parametrize('size', [int(size) for size in sizes.split(',')])
+
+@pytest.fixture
+def pp():
+    # properties are read through VIPhreeqc in every round, not from the cache
+    with PhreeqPython(cache_properties=False) as pp:
+        yield pp
+
+@pytest.fixture
+def solutions(pp, size):
+    return [pp.add_solution_simple({'CaCl2': 1, 'NaHCO3': 2}) for _ in range(size)]
@@ -0,0 +1,97 @@
+""" Benchmarks of the PhreeqPython hot paths, see benchmarks/README.md """
+
+import numpy as np
+import pytest
+
+from phreeqpython import PhreeqPython
+
+def test_construction(benchmark):
+    benchmark(lambda: PhreeqPython(cache_database=False).close())
+
+def test_construction_cached(benchmark):
+    benchmark(lambda: PhreeqPython().close())
+
+def test_add_solution_simple(benchmark, pp, size):
+    def add_solutions():
+        for _ in range(size):
+            pp.add_solution_simple({'CaCl2': 1, 'NaHCO3': 2})
+    benchmark(add_solutions)
+
+def test_solution_add(benchmark, solutions):
+    def add():
+        for solution in solutions:
+            solution.add('NaOH', 0.1)
+    benchmark(add)
+
+def test_solution_change(benchmark, solutions):
+    def change():
+        for solution in solutions:
+            solution.change({'NaOH': 0.1, 'HCl': 0.1})
+    benchmark(change)
+
+def test_mix(benchmark, solutions):
+    def mix():
+        for solution in solutions:
+            (solution * 0.5 + solutions[0] * 0.5).forget()
+    benchmark(mix)
+
+def test_equalize(benchmark, solutions):
+    def equalize():
+        for solution in solutions:
+            solution.equalize('Calcite', 0)
+    benchmark(equalize)
+
+def test_change_ph(benchmark, solutions):
+    def change_ph():
+        for solution in solutions:
+            solution.change_ph(8)
+    benchmark(change_ph)
+
+def test_species_activities(benchmark, solutions):
+    benchmark(lambda: [solution.species_activities for solution in solutions])
+
+def test_phases(benchmark, solutions):
+    benchmark(lambda: [solution.phases for solution in solutions])
+
+def test_phases_cached(benchmark, size):
+    with PhreeqPython() as pp:
+        solutions = [pp.add_solution_simple({'CaCl2': 1, 'NaHCO3': 2}) for _ in range(size)]
+        benchmark(lambda: [solution.phases for solution in solutions])
+
+def test_dump_and_load(benchmark, pp, solutions, tmp_path):
+    filename = str(tmp_path / 'dump.gz')
+    def dump_and_load():
+        pp.dump_solutions(filename=filename)
+        PhreeqPython(from_file=filename).close()
+    benchmark(dump_and_load)
+
+def test_kinetics(benchmark, pp):
+    pytest.importorskip('scipy')
+    solution = pp.add_solution_simple({'NaHCO3': 1})
+
+    def rate(sol, dissolved, m0):
+        return -0.01 * sol.si('Calcite')
+
+    def kinetics():
+        for _ in solution.kinetics('CaCO3', rate, np.linspace(0, 10, 11)):
+            pass
+    benchmark(kinetics)
+
+def test_sweep(benchmark, pp, size):
+    solution = pp.add_solution_simple({'CaCl2': 1, 'NaHCO3': 2})
+    doses = np.linspace(0, 2, size)
+    benchmark(lambda: solution.sweep('NaOH', doses, ['pH', 'si:Calcite']))
+
+def test_punch(benchmark, pp, solutions):
+    benchmark(lambda: pp.punch(solutions, ['pH', 'sc', 'si:Calcite']))
+
+def test_add_solutions_from_table(benchmark, pp, size):
+    table = {'CaCl2': np.full(size, 1.), 'NaHCO3': np.full(size, 2.)}
+    benchmark(lambda: pp.add_solutions_from_table(table))
+
+def test_mix_many(benchmark, pp, size):
+    sources = [pp.add_solution_simple({'CaCl2': 1, 'NaHCO3': 2}),
+               pp.add_solution_simple({'NaCl': 2}),
+               pp.add_solution_simple({'MgSO4': 1})]
+    fractions = np.random.default_rng(0).dirichlet(np.ones(len(sources)), size)
+    benchmark(lambda: pp.mix_many(sources, fractions, ['pH', 'si:Calcite']))
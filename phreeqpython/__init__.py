@@ -1,3 +1,8 @@
 from .phreeqpython import PhreeqPython
 from .solution import Solution
+from .collection import SolutionCollection
 from .gas import Gas
+from .pool import PhreeqPool
+from .enginepool import EnginePool
+from .asyncphreeqpython import AsyncPhreeqPython
+from .profiler import Profiler
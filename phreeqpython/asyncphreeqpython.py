@@ -0,0 +1,101 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from .enginepool import EnginePool
+
+class AsyncPhreeqPython(object):
+    """ asyncio front-end for PhreeqPython
+
+    Calculations are offloaded to a thread per engine of an EnginePool, so the
+    event loop is never blocked by VIPhreeqc. At most `max_pending` calls are
+    submitted at a time; further callers wait without occupying a thread.
+
+        async with AsyncPhreeqPython(engines=4) as app:
+            sol = await app.add_solution_simple({'NaCl': 1})
+            ph = await app.get(sol, 'pH')
+
+    Solutions stay bound to the engine that created them. Operations on a
+    solution run on that engine, so mixing is only possible for solutions
+    created on the same engine (see `engine` argument of add_solution).
+    """
+
+    def __init__(self, engines=None, database=None, database_directory=None,
+                 max_pending=None, timeout=None):
+        self.pool = EnginePool(engines, database=database, database_directory=database_directory)
+        self.max_pending = max_pending or 4 * self.pool.size
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(self.pool.size)
+        self._semaphore = None
+
+    def _call(self, engine, function, args, kwargs):
+        with self.pool.checkout(engine) as pp:
+            return function(pp, *args, **kwargs)
+
+    async def run(self, function, *args, engine=None, **kwargs):
+        """ Run function(pp, *args, **kwargs) on an engine in a worker thread. If
+        the call is cancelled before it started, it is never run """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_pending)
+        await self._semaphore.acquire()
+        loop = asyncio.get_running_loop()
+        try:
+            future = self._executor.submit(self._call, engine, function, args, kwargs)
+        except BaseException:
+            self._semaphore.release()
+            raise
+        # the slot is freed when the call finished or was cancelled before it
+        # started, not when waiting for it timed out while the thread still runs
+        future.add_done_callback(lambda _: self._release(loop))
+        return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+
+    def _release(self, loop):
+        try:
+            loop.call_soon_threadsafe(self._semaphore.release)
+        except RuntimeError:
+            # the event loop is already closed
+            pass
+
+    async def add_solution(self, composition=None, extraneous=None, engine=None):
+        return await self.run(lambda pp: pp.add_solution(composition, extraneous), engine=engine)
+
+    async def add_solution_simple(self, composition=None, temperature=25, units='mmol', engine=None):
+        return await self.run(lambda pp: pp.add_solution_simple(composition, temperature, units),
+                              engine=engine)
+
+    async def mix_solutions(self, solutions):
+        engine = next(iter(solutions)).pp
+        return await self.run(lambda pp: pp.mix_solutions(solutions), engine=engine)
+
+    async def equalize_solution(self, solution, phases, to_si, in_phase=[10], with_element=[None]):
+        return await self.run(lambda pp: solution.equalize(phases, to_si, in_phase, with_element),
+                              engine=solution.pp)
+
+    async def change_solution(self, solution, composition, units='mmol'):
+        return await self.run(lambda pp: solution.change(composition, units), engine=solution.pp)
+
+    async def get(self, solution, output):
+        """ Read a solution output (see Solution.get) """
+        return await self.run(lambda pp: solution.get(output), engine=solution.pp)
+
+    async def get_many(self, solution, outputs):
+        """ Read several solution outputs in a single call, returns a dict """
+        return await self.run(lambda pp: {output: solution.get(output) for output in outputs},
+                              engine=solution.pp)
+
+    async def snapshot(self, solution):
+        return await self.run(lambda pp: solution.snapshot(), engine=solution.pp)
+
+    async def forget(self, solution):
+        return await self.run(lambda pp: solution.forget(), engine=solution.pp)
+
+    def close(self):
+        self._executor.shutdown()
+        self.pool.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        # shutting down waits for running calls, so it is done off the event loop
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
+        return False
@@ -0,0 +1,65 @@
+class Batch(object):
+    """ PhreeqPython Batch Class
+
+    Queues the input of all operations performed on a PhreeqPython instance
+    and runs it as a single PHREEQC input when the batch is committed:
+
+        with pp.batch():
+            sol1 = pp.add_solution_simple({'NaCl': 1})
+            sol2 = sol1.copy().add('NaOH', 1)
+        print(sol2.pH)
+
+    The returned Solution handles resolve after the commit. Properties read
+    within the batch reflect the state before the batch was started. Other
+    threads using the instance wait until the batch is committed.
+    """
+    def __init__(self, phreeqpython):
+        self.pp = phreeqpython
+        self.blocks = []
+
+    def queue(self, inputstr):
+        """ Add the input of a single operation to the batch """
+        inputstr = inputstr.rstrip()
+        # every operation runs as a separate simulation
+        if not inputstr.endswith("END"):
+            inputstr += "\nEND"
+        self.blocks.append(inputstr)
+
+    def commit(self):
+        """ Run all queued operations in a single PHREEQC run """
+        blocks, self.blocks = self.blocks, []
+        if blocks:
+            self.pp.ip.run_string("\n".join(blocks) + "\n")
+
+    def discard(self):
+        """ Drop all queued operations """
+        self.blocks = []
+
+    def __enter__(self):
+        # the instance lock is held for the whole batch, so operations of other
+        # threads wait instead of being queued in this batch
+        self.pp.lock.acquire()
+        try:
+            if self.pp._batch is not None:
+                raise RuntimeError("A batch is already active on this PhreeqPython instance")
+            if self.pp.chain:
+                raise RuntimeError("Cannot start a batch while a chain is active")
+        except RuntimeError:
+            self.pp.lock.release()
+            raise
+        self.pp._batch = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.pp._batch = None
+        try:
+            if exc_type is not None:
+                self.discard()
+            else:
+                self.commit()
+        finally:
+            self.pp.lock.release()
+        return False
+
+    def __len__(self):
+        return len(self.blocks)
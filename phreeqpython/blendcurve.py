@@ -0,0 +1,26 @@
+import numpy as np
+
+class BlendCurve(object):
+    """ Result of PhreeqPython.blend_curve
+
+    fractions:        fractions of the second solution in the blends
+    values:           structured array with the requested outputs per blend
+    iterations:       PHREEQC iterations per blend, calculated incrementally
+    cold_iterations:  iterations per blend when every blend is calculated from
+                      scratch (only if compared, otherwise None)
+    """
+    def __init__(self, fractions, values, iterations, cold_iterations=None):
+        self.fractions = fractions
+        self.values = values
+        self.iterations = iterations
+        self.cold_iterations = cold_iterations
+
+    def __getitem__(self, output):
+        return self.values[output]
+
+    @property
+    def iterations_saved(self):
+        """ Iterations saved by the incremental calculation, if compared """
+        if self.cold_iterations is None:
+            return None
+        return int(np.sum(self.cold_iterations) - np.sum(self.iterations))
@@ -0,0 +1,117 @@
+import numpy as np
+
+from .solution import Solution, SCALAR_GETTERS
+from .utility import convert_units_array
+
+class SolutionCollection(object):
+    """ PhreeqPython SolutionCollection Class
+
+    An array of solution numbers belonging to one PhreeqPython instance, with
+    vectorised properties and methods that return NumPy arrays. Extraneous
+    data is kept as columns aligned with the numbers. Indexing with an integer
+    returns a Solution, indexing with a slice, mask or index array returns a
+    new SolutionCollection.
+    """
+
+    def __init__(self, phreeqpython, numbers, extraneous=None):
+        self.pp = phreeqpython
+        self.numbers = np.asarray(numbers, dtype=int)
+        self.extraneous = {name: np.asarray(column) for name, column in (extraneous or {}).items()}
+        if phreeqpython.reclaim:
+            phreeqpython._track_numbers(self, 'solution', self.numbers.tolist())
+
+    def __len__(self):
+        return len(self.numbers)
+
+    def __iter__(self):
+        for index in range(len(self.numbers)):
+            yield self[index]
+
+    def __getitem__(self, index):
+        numbers = self.numbers[index]
+        if np.ndim(numbers) == 0:
+            number = int(numbers)
+            # the extraneous columns are only copied to solutions that are used
+            if self.extraneous and number not in self.pp._extraneous:
+                self.pp._extraneous[number] = {name: column[index].item()
+                                               for name, column in self.extraneous.items()}
+            return Solution(self.pp, number)
+        extraneous = {name: column[index] for name, column in self.extraneous.items()}
+        return SolutionCollection(self.pp, numbers, extraneous)
+
+    def _values(self, getter):
+        """ Returns getter(ip, number) for all solutions as an array """
+        pp = self.pp
+        numbers = self.numbers.tolist()
+        with pp.lock:
+            pp.recalculate(numbers)
+            ip = pp.ip
+            return np.array([getter(ip, number) for number in numbers], dtype=float)
+
+    def _scalar(self, name):
+        values = self._values(SCALAR_GETTERS[name])
+        precomputed = self.pp._precomputed
+        if precomputed:
+            for row, number in enumerate(self.numbers.tolist()):
+                if number in precomputed:
+                    values[row] = precomputed[number][name]
+        return values
+
+    def snapshot(self):
+        """ Returns the scalar properties of all solutions as a structured array """
+        return self.pp.snapshot(self.numbers.tolist())
+
+    def extract(self, outputs):
+        """ Returns outputs (see Solution.get) of all solutions as a structured array """
+        return self.pp.extract(self.numbers.tolist(), outputs)
+
+    def si(self, phase):
+        """ Returns the SI of a phase in all solutions """
+        return self.pp.si_matrix(self.numbers.tolist(), [phase])[:, 0]
+
+    def sr(self, phase):
+        """ Returns the saturation ratio of a phase in all solutions """
+        return 10**self.si(phase)
+
+    def total(self, element, units='mmol'):
+        """ Returns the total of a species or element in all solutions """
+        amounts = self._values(lambda ip, number: ip.get_total_ion(number, element))
+        return convert_units_array(element, amounts, 'mol', units)
+
+    def total_element(self, element, units='mmol'):
+        """ Returns the total of an element in all solutions """
+        amounts = self._values(lambda ip, number: ip.get_total_element(number, element))
+        return convert_units_array(element, amounts, 'mol', units)
+
+    def forget(self):
+        """ Remove all solutions from VIPhreeqc memory """
+        self.pp.remove_solutions(self.numbers.tolist())
+
+    @property
+    def pH(self):
+        return self._scalar('pH')
+    @property
+    def pe(self):
+        return self._scalar('pe')
+    @property
+    def sc(self):
+        return self._scalar('sc')
+    @property
+    def I(self):
+        return self._scalar('I')
+    @property
+    def temperature(self):
+        return self._scalar('temperature')
+    @property
+    def mass(self):
+        return self._scalar('mass')
+    @property
+    def volume(self):
+        return self._scalar('volume')
+    @property
+    def density(self):
+        return self._scalar('density')
+
+    # pretty printing
+    def __str__(self):
+        return f"<PhreeqPython.{self.__class__.__name__} of {len(self)} solutions>"
@@ -0,0 +1,80 @@
+""" Process wide cache of database files and loaded VIPhreeqc instances
+
+Parsing a database is the dominant cost of creating a PhreeqPython instance.
+Instances released with PhreeqPython.close() are emptied and kept here, keyed
+on the database path and modification time, so the next PhreeqPython using the
+same database can reuse the already loaded IPhreeqc instance. Instances whose
+database was changed, by PhreeqPython or by input run directly on the VIPhreeqc
+instance, are never reused.
+"""
+
+import os
+import threading
+
+from .viphreeqc import VIPhreeqc
+
+# maximum number of idle VIPhreeqc instances kept per database
+MAX_IDLE_INSTANCES = 8
+
+_lock = threading.Lock()
+_contents = {}
+_instances = {}
+
+def database_key(path):
+    """ Returns the cache key of a database file: its absolute path and mtime """
+    path = os.path.abspath(str(path))
+    return path, os.path.getmtime(path)
+
+def _discard_stale(key):
+    # drop entries for older versions of the same database file
+    for cache in (_contents, _instances):
+        for stale in [k for k in cache if k[0] == key[0] and k != key]:
+            del cache[stale]
+
+def database_contents(key):
+    """ Returns the raw contents of a database file """
+    with _lock:
+        contents = _contents.get(key)
+        if contents is None:
+            _discard_stale(key)
+            with open(key[0], 'rb') as database:
+                contents = _contents[key] = database.read()
+        return contents
+
+def get_instance(key):
+    """ Returns a VIPhreeqc instance with the database loaded, reusing an idle
+    instance if available """
+    with _lock:
+        idle = _instances.get(key)
+        if idle:
+            return idle.pop()
+    ip = VIPhreeqc()
+    ip.load_database_string(database_contents(key))
+    return ip
+
+def release_instance(key, ip):
+    """ Empty a VIPhreeqc instance and keep it for reuse. Instances on which
+    persistent definitions (see VIPhreeqc.database_modified) were run are
+    destroyed instead """
+    if ip.database_modified:
+        ip.destroy_iphreeqc()
+        return
+    ip.clear_hooks()
+    ip.debug = False
+    ip.run_string("DELETE \n-all\nEND\n")
+    with _lock:
+        _discard_stale(key)
+        idle = _instances.setdefault(key, [])
+        if len(idle) < MAX_IDLE_INSTANCES:
+            idle.append(ip)
+            return
+    ip.destroy_iphreeqc()
+
+def clear():
+    """ Empty the cache """
+    with _lock:
+        _contents.clear()
+        for idle in _instances.values():
+            for ip in idle:
+                ip.destroy_iphreeqc()
+        _instances.clear()
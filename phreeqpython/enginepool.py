@@ -0,0 +1,105 @@
+import os
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+from .phreeqpython import PhreeqPython
+
+class EnginePool(object):
+    """ Pool of PhreeqPython instances, each with its own IPhreeqc instance,
+    within a single process.
+
+    Threads check out an engine for exclusive use. The ctypes calls into
+    VIPhreeqc release the GIL, so independent calculations on separate
+    engines run concurrently:
+
+        pool = EnginePool(4)
+        with pool.checkout() as pp:
+            sol = pp.add_solution_simple({'NaCl': 1})
+            ph = sol.pH
+
+    Solutions are bound to the engine that created them (`solution.pp`), and
+    should only be used while that engine is checked out.
+    """
+
+    def __init__(self, size=None, database=None, database_directory=None):
+        self.size = size or os.cpu_count() or 1
+        self.engines = [PhreeqPython(database=database, database_directory=database_directory)
+                        for _ in range(self.size)]
+        self._free = list(self.engines)
+        self._condition = threading.Condition()
+        self._local = threading.local()
+        self._executor = None
+
+    def acquire(self, engine=None, timeout=None):
+        """ Check out a free engine, or the given engine, waiting until it becomes
+        available. Returns None if the timeout expires """
+        with self._condition:
+            available = lambda: (engine in self._free) if engine is not None else self._free
+            if not self._condition.wait_for(available, timeout):
+                return None
+            if engine is None:
+                engine = self._free.pop()
+            else:
+                self._free.remove(engine)
+            return engine
+
+    def release(self, engine):
+        """ Return a checked out engine to the pool """
+        with self._condition:
+            self._free.append(engine)
+            self._condition.notify_all()
+
+    @contextmanager
+    def checkout(self, engine=None, timeout=None):
+        """ Context manager checking out an engine for the current thread. Nested
+        checkouts within a thread return the engine it already holds """
+        held = getattr(self._local, 'engine', None)
+        if held is not None and engine in (None, held):
+            yield held
+            return
+
+        engine = self.acquire(engine, timeout)
+        if engine is None:
+            raise TimeoutError("No PhreeqPython engine available")
+        self._local.engine = engine
+        try:
+            yield engine
+        finally:
+            self._local.engine = held
+            self.release(engine)
+
+    def _call(self, function, args, kwargs):
+        with self.checkout() as pp:
+            return function(pp, *args, **kwargs)
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.size)
+        return self._executor
+
+    def submit(self, function, *args, **kwargs):
+        """ Run function(pp, *args, **kwargs) on a free engine in a worker thread,
+        returns a Future """
+        return self.executor.submit(self._call, function, args, kwargs)
+
+    def map(self, function, items):
+        """ Run function(pp, item) for all items concurrently and return the
+        results in input order """
+        return [future.result() for future in [self.submit(function, item) for item in items]]
+
+    def close(self):
+        """ Shut down the worker threads and release the engines """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        for engine in self.engines:
+            engine.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
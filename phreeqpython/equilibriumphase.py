@@ -4,6 +4,11 @@ class EquilibriumPhase(object):
         self.pp = phreeqpython
         self.number = number
 
+    def _read(self, getter):
+        """ Call a VIPhreeqc getter for this equilibrium phase while holding the instance lock """
+        with self.pp.lock:
+            return getattr(self.pp.ip, getter)(self.number)
+
     @property
     def components(self):
-        return self.pp.ip.get_equilibrium_phase_components_moles(self.number) 
\ No newline at end of file
+        return self._read('get_equilibrium_phase_components_moles') 
\ No newline at end of file
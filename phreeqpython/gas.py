@@ -8,6 +8,13 @@ class Gas(object):
     def __init__(self, phreeqpython, number):
         self.pp = phreeqpython
         self.number = number
+        if phreeqpython.reclaim:
+            phreeqpython._track(self, 'gas')
+
+    def _read(self, getter):
+        """ Call a VIPhreeqc getter for this gas phase while holding the instance lock """
+        with self.pp.lock:
+            return getattr(self.pp.ip, getter)(self.number)
 
     def copy(self):
         """ Create a new copy, with unique solution number, from this solution """
@@ -19,23 +26,23 @@ class Gas(object):
 
     @property
     def pressure(self):
-        return self.pp.ip.get_gas_pressure(self.number)
+        return self._read('get_gas_pressure')
     @property
     def volume(self):
-        return self.pp.ip.get_gas_volume(self.number) 
+        return self._read('get_gas_volume') 
     @property
     def total_moles(self):
-        return self.pp.ip.get_gas_total_moles(self.number) 
+        return self._read('get_gas_total_moles') 
 
     @property
     def components(self):
-        return self.pp.ip.get_gas_components_moles(self.number) 
+        return self._read('get_gas_components_moles') 
     @property
     def fractions(self):
-        return self.pp.ip.get_gas_components_fractions(self.number) 
+        return self._read('get_gas_components_fractions') 
     @property
     def partial_pressures(self):
-        return self.pp.ip.get_gas_components_pressures(self.number) 
+        return self._read('get_gas_components_pressures') 
 
     @property
     def dry_fractions(self):
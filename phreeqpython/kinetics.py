@@ -0,0 +1,177 @@
+import time
+
+import numpy as np
+
+from .utility import convert_units
+
+def require_scipy():
+    """ Raise an ImportError with installation instructions if scipy, which
+    is needed for kinetics, is not installed """
+    try:
+        import scipy  # noqa: F401
+    except ImportError as exc:
+        raise ImportError(
+            "kinetics requires scipy. Install with "
+            "'pip install phreeqpython[kinetics]' or install scipy manually."
+        ) from exc
+
+class KineticsResult(object):
+    """ Result of KineticsSolver.solve
+
+    t, y:               output times and cumulative amount reacted (mmol)
+    t_events, y_events: times and amounts at which the events occurred
+    evaluations:        number of rate function evaluations
+    cache_hits:         number of rate evaluations served from the cache
+    evaluation_t:       time (t) of every rate evaluation
+    evaluation_times:   wall time (s) of every rate evaluation
+    """
+    def __init__(self, t, y, t_events, y_events, solver):
+        self.t = t
+        self.y = y
+        self.t_events = t_events
+        self.y_events = y_events
+        self.evaluations = solver.evaluations
+        self.cache_hits = solver.cache_hits
+        self.evaluation_t = np.array(solver.evaluation_t)
+        self.evaluation_times = np.array(solver.evaluation_times)
+
+    @property
+    def total_time(self):
+        """ Total wall time spent in rate evaluations """
+        return self.evaluation_times.sum()
+
+class KineticsSolver(object):
+    """ Integrates the amount of a chemical reacting with a solution over time
+
+    The rate function is called as rate_function(solution, y, m0, *args), where
+    solution is the original solution with y mmol of the chemical added. Every
+    evaluation reacts the original solution into a single scratch solution in
+    one PHREEQC run, and rates are cached per state, since the ODE solvers
+    regularly evaluate the same state more than once.
+    """
+    def __init__(self, solution, element, rate_function, m0=0, args=()):
+        self.solution = solution
+        self.element = element
+        self.rate_function = rate_function
+        self.m0 = m0
+        self.args = tuple(args)
+        self.scratch = None
+        self.cache = {}
+        self.evaluations = 0
+        self.cache_hits = 0
+        self.evaluation_t = []
+        self.evaluation_times = []
+
+    def rate(self, y, t=None):
+        """ Returns the rate at an amount reacted of y mmol """
+        y = float(np.ravel(y)[0])
+        if y in self.cache:
+            self.cache_hits += 1
+            return self.cache[y]
+
+        start = time.perf_counter()
+        pp = self.solution.pp
+        if self.scratch is None:
+            self.scratch = self.solution.copy()
+        pp.change_solution(self.solution.number,
+                           {self.element: convert_units(self.element, y, 'mmol', 'mol')},
+                           save_as=self.scratch.number)
+        rate = self.rate_function(self.scratch, y, self.m0, *self.args)
+
+        self.evaluations += 1
+        self.evaluation_t.append(t)
+        self.evaluation_times.append(time.perf_counter() - start)
+        self.cache[y] = rate
+        return rate
+
+    def odeint(self, time):
+        """ Integrate with scipy's odeint, returns the amount reacted at every time """
+        from scipy.integrate import odeint
+        return odeint(lambda y, t: self.rate(y, t), 0, time)[:, 0]
+
+    def solve(self, time, method='LSODA', events=None, **options):
+        """ Integrate with scipy's solve_ivp (e.g. method='BDF' or 'Radau' for
+        stiff systems), evaluated at the given times. Events are called as
+        event(t, y) like in solve_ivp """
+        from scipy.integrate import solve_ivp
+        time = np.asarray(time, dtype=float)
+        result = solve_ivp(lambda t, y: [self.rate(y, t)], (time[0], time[-1]), [0],
+                           method=method, t_eval=time, events=events, **options)
+        if not result.success:
+            raise RuntimeError("Kinetics integration failed: %s" % result.message)
+        return KineticsResult(result.t, result.y[0], result.t_events, result.y_events, self)
+
+    def close(self):
+        """ Remove the scratch solution """
+        if self.scratch is not None:
+            self.scratch.forget()
+            self.scratch = None
+
+class BatchKineticsSolver(object):
+    """ Integrates the same kinetic reaction for many solutions at once
+
+    The amounts reacted with all solutions form a single ODE system. Every rate
+    evaluation reacts all solutions whose state changed into their scratch
+    solutions in one batched PHREEQC run, after which rate_function is called
+    per solution like in KineticsSolver.
+    """
+    def __init__(self, solutions, element, rate_function, m0=0, args=()):
+        self.solutions = list(solutions)
+        self.pp = self.solutions[0].pp
+        self.element = element
+        self.rate_function = rate_function
+        self.m0 = np.broadcast_to(m0, len(self.solutions))
+        self.args = tuple(args)
+        self.scratch = None
+        self.cache = {}
+        self.evaluations = 0
+        self.cache_hits = 0
+
+    def rates(self, y):
+        """ Returns the rates of all solutions at amounts reacted y (mmol) """
+        y = [float(value) for value in y]
+        todo = [i for i in range(len(y)) if (i, y[i]) not in self.cache]
+        self.cache_hits += len(y) - len(todo)
+
+        if todo:
+            if self.scratch is None:
+                with self.pp.batch():
+                    self.scratch = [solution.copy() for solution in self.solutions]
+            with self.pp.batch():
+                for i in todo:
+                    self.pp.change_solution(
+                        self.solutions[i].number,
+                        {self.element: convert_units(self.element, y[i], 'mmol', 'mol')},
+                        save_as=self.scratch[i].number)
+            for i in todo:
+                self.cache[(i, y[i])] = self.rate_function(self.scratch[i], y[i], self.m0[i], *self.args)
+            self.evaluations += len(todo)
+
+        return np.array([self.cache[(i, y[i])] for i in range(len(y))])
+
+    def solve(self, time, method='LSODA', **options):
+        """ Integrate with scipy's solve_ivp, returns the amounts reacted as an
+        array of shape (n_solutions, n_times) """
+        from scipy.integrate import solve_ivp
+        from scipy.sparse import identity
+
+        n = len(self.solutions)
+        time = np.asarray(time, dtype=float)
+        # the reactors are independent, so the Jacobian is diagonal
+        if method == 'LSODA':
+            options.setdefault('lband', 0)
+            options.setdefault('uband', 0)
+        elif method in ('BDF', 'Radau'):
+            options.setdefault('jac_sparsity', identity(n))
+
+        result = solve_ivp(lambda t, y: self.rates(y), (time[0], time[-1]), np.zeros(n),
+                           method=method, t_eval=time, **options)
+        if not result.success:
+            raise RuntimeError("Kinetics integration failed: %s" % result.message)
+        return result.y
+
+    def close(self):
+        """ Remove the scratch solutions """
+        if self.scratch is not None:
+            self.pp.remove_solutions([solution.number for solution in self.scratch])
+            self.scratch = None
@@ -2,27 +2,96 @@
 
 import os
 import gzip
+import functools
+import collections
+import weakref
+import itertools
+import contextlib
+import threading
 from pathlib import Path
-from .viphreeqc import VIPhreeqc
+from .viphreeqc import VIPhreeqc, SOLUTION_PROPERTIES
 from .solution import Solution
+from .collection import SolutionCollection
 from .gas import Gas
 from .equilibriumphase import EquilibriumPhase
-from .utility import convert_units
+from .batch import Batch
+from .blendcurve import BlendCurve
+from .kinetics import BatchKineticsSolver, require_scipy
+from . import dbcache
+from .resultcache import ResultCache, make_key
+from .utility import convert_units, convert_units_array
 import warnings
+import pickle
+import numpy as np
+
+# version of the save_checkpoint file format
+CHECKPOINT_VERSION = 1
+
+# SELECTED_OUTPUT and USER_PUNCH number used by punch
+PUNCH_USER_NUMBER = 9999
+
+# BASIC expressions of the outputs supported by punch, in the units of the
+# corresponding Solution properties and methods
+PUNCH_EXPRESSIONS = {
+    'pH': '-LA("H+")',
+    'pe': '-LA("e-")',
+    'sc': 'SC',
+    'I': 'MU',
+    'temperature': 'TC',
+    'mass': 'TOT("water")',
+    'volume': 'SOLN_VOL',
+    'density': 'RHO',
+    'si': 'SI("{}")',
+    'sr': 'SR("{}")',
+    'total_element': 'TOTMOLE("{}") * 1000',
+    'activity': 'ACT("{}") * 1000',
+    'molality': 'MOL("{}") * 1000',
+    'moles': 'MOL("{}") * TOT("water") * 1000',
+    'iterations': 'ITERATIONS',
+}
+
+def synchronized(method):
+    """ Run a PhreeqPython method while holding the instance lock """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
 
 class PhreeqPython(object):
     """ PhreeqPython Class to interact with the VIPHREEQC module """
 
     def __init__(self, database=None, database_directory = None, from_file=None,
-        debug=False):
-        # Create VIPhreeqc Instance
-        self.ip = VIPhreeqc()
-        self.ip.debug = debug
+        debug=False, cache_database=True, reclaim=False, from_checkpoint=None,
+        lazy=True, result_cache=0, cache_properties=True):
+        # protects the counters, buffers and the IPhreeqc instance itself
+        self.lock = threading.RLock()
         self.chain = False
         self.chain_buffer = ""
+        self._batch = None
+        # automatic reclamation of solutions and gas phases without handles
+        self.reclaim = reclaim
+        self._handles = {}
+        self._reclaim_queue = collections.deque()
+        self._free_numbers = {'solution': set(), 'gas': set()}
+        # numbers allocated while streaming a chunk
+        self._allocated = None
+        # extraneous data per solution number
+        self._extraneous = {}
+        # scalar properties of solutions loaded from a checkpoint
+        self._precomputed = {}
+        # solutions loaded without speciation
+        self._stale = set()
+        # properties read from solutions, dropped when the solution changes
+        self.cache_properties = cache_properties
+        self._property_cache = {}
+        self._versions = {}
+        # opt-in cache of equilibrated solutions, result_cache is its size
+        self.result_cache = ResultCache(result_cache) if result_cache else None
         # Load Vitens.dat database. The VIPhreeqc module is unable to handle relative paths
         if not database:
             database = "vitens.dat"
+        self.database = database
 
         if not database_directory:
             database_directory = Path(os.path.dirname(__file__) + "/database")
@@ -34,8 +103,20 @@ class PhreeqPython(object):
         if not database_path.exists():
             raise FileNotFoundError("Database file not found")
 
-        self.ip.load_database(database_path)
+        # Create VIPhreeqc Instance, reusing a released instance with the same
+        # database if possible
+        self._database_key = dbcache.database_key(database_path) if cache_database else None
+        if self._database_key:
+            self.ip = dbcache.get_instance(self._database_key)
+        else:
+            self.ip = VIPhreeqc()
+            self.ip.load_database(database_path)
+        self.ip.debug = debug
 
+        self.buffer = False
+        self.solution_counter = -1
+        self.gas_counter = -1
+        self.phase_counter = -1
 
         if from_file:
             dump = gzip.open(from_file,"rb")
@@ -43,22 +124,214 @@ class PhreeqPython(object):
                 inputstr = dump.read().decode('utf-8') + "END"
                 self.ip.run_string(inputstr)
 
-                solutions = self.ip.get_solution_list()
-                # force IPHREEQC to calculate all the solution properties
-                for solution_number in solutions:
-                    self.change_solution(solution_number,{'Na':0})
-
-                self.solution_counter = solutions[-1]
-                # precalculte all solutions
+                solutions = [n for n in self.ip.get_solution_list() if n >= 0]
+                self.solution_counter = max(solutions, default=-1)
+                # loaded solutions are calculated on first use, or all at once
+                # when lazy loading is disabled
+                self._stale.update(solutions)
+                if not lazy:
+                    self.recalculate()
             finally:
                 dump.close()
 
+        elif from_checkpoint:
+            self.load_checkpoint(from_checkpoint)
+
+    def _run(self, inputstr):
+        """ Run PHREEQC input, or queue it when a batch is active """
+        if self._batch is not None:
+            self._batch.queue(inputstr)
         else:
-            self.buffer = False
-            self.solution_counter = -1
-            self.gas_counter = -1
-            self.phase_counter = -1
-        
+            self.ip.run_string(inputstr)
+
+    def _invalidate(self, numbers):
+        """ Called for every solution that is changed or removed """
+        for number in numbers:
+            self._versions[number] = self._versions.get(number, 0) + 1
+            self._property_cache.pop(number, None)
+            self._precomputed.pop(number, None)
+            self._stale.discard(number)
+        if self.result_cache:
+            self._discard_masters(self.result_cache.invalidate(numbers))
+
+    def _result_cache_active(self):
+        # cached solutions are only created and reused outside of batches, chains
+        # and streams, whose solutions may not exist yet or are removed again
+        return (self.result_cache is not None and not self.chain
+                and self._batch is None and self._allocated is None)
+
+    def _from_result_cache(self, key):
+        """ Returns the number of a new copy of a cached solution, or None """
+        if not self._result_cache_active():
+            return None
+        # allocating a number may delete reclaimed parents, and with them the
+        # cached mixtures, so the number is allocated before the lookup
+        number = self._new_solution_number()
+        master = self.result_cache.get(key)
+        if master is None:
+            self._release_numbers('solution', [number])
+            return None
+        self._run("COPY SOLUTION {} {}\nEND\n".format(master, number))
+        self._invalidate([number])
+        return number
+
+    def _to_result_cache(self, key, number, parents=()):
+        """ Store a copy of a newly created solution in the result cache """
+        if not self._result_cache_active():
+            return
+        master = self._new_solution_number()
+        self._run("COPY SOLUTION {} {}\nEND\n".format(number, master))
+        self._invalidate([master])
+        self._discard_masters(self.result_cache.put(key, master, parents))
+
+    def _discard_masters(self, masters):
+        if masters:
+            self._run("DELETE \n-solution " + ' '.join(map(str, masters)) + "\n")
+            self._release_numbers('solution', masters)
+
+    def result_cache_info(self):
+        """ Returns the hits, misses, maximum and current size of the result
+        cache, or None if it is disabled """
+        return self.result_cache.info() if self.result_cache is not None else None
+
+    @synchronized
+    def clear_result_cache(self):
+        """ Remove all cached solutions """
+        if self.result_cache is not None:
+            self._discard_masters(self.result_cache.clear())
+
+    @synchronized
+    def recalculate(self, numbers=None):
+        """ Speciate solutions that were loaded without calculation (all of them by
+        default) in a single run """
+        if numbers is None:
+            numbers = sorted(self._stale)
+        else:
+            numbers = [number for number in numbers if number in self._stale]
+        if not numbers:
+            return
+        inputstr = ""
+        for number in numbers:
+            inputstr += "USE SOLUTION {0}\nREACTION 1\nNa 0\n1 mol\nSAVE SOLUTION {0}\nEND\n".format(number)
+        # run immediately, also when a batch is active
+        self.ip.run_string(inputstr)
+        self._stale.difference_update(numbers)
+
+    def profile(self):
+        """ Returns a context manager that profiles the calls into VIPhreeqc
+        made within it, and yields a Profiler with the statistics per call """
+        return self.ip.profile()
+
+    def batch(self):
+        """ Returns a Batch context manager. All operations performed within the
+        context are compiled into a single PHREEQC input, which is run on exit """
+        return Batch(self)
+
+    def _new_solution_number(self):
+        """ Returns the number for a new solution, reusing released numbers """
+        return self._new_number('solution')
+
+    def _new_gas_number(self):
+        """ Returns the number for a new gas phase, reusing released numbers """
+        return self._new_number('gas')
+
+    @synchronized
+    def _new_number(self, kind):
+        if self._reclaim_queue and not self.chain:
+            self.collect()
+        free = self._free_numbers[kind]
+        if free:
+            number = min(free)
+            free.remove(number)
+        elif kind == 'solution':
+            self.solution_counter += 1
+            number = self.solution_counter
+        else:
+            self.gas_counter += 1
+            number = self.gas_counter
+        if kind == 'solution' and self._allocated is not None:
+            self._allocated.append(number)
+        return number
+
+    @synchronized
+    def _release_numbers(self, kind, numbers):
+        """ Make numbers of deleted solutions or gas phases available for reuse """
+        free = self._free_numbers[kind]
+        counter = self.solution_counter if kind == 'solution' else self.gas_counter
+        # numbers that were never handed out or are already free are ignored,
+        # so a number can not end up in the free-list twice
+        free.update(n for n in numbers if 0 <= n <= counter)
+        # numbers at the top of the range are returned to the counter
+        if kind == 'solution':
+            while self.solution_counter in free:
+                free.remove(self.solution_counter)
+                self.solution_counter -= 1
+        else:
+            while self.gas_counter in free:
+                free.remove(self.gas_counter)
+                self.gas_counter -= 1
+
+    def _track(self, handle, kind):
+        """ Count a Solution or Gas handle, and queue its number for deletion once
+        all handles to it have been garbage collected """
+        # the finaliser only queues, counts are updated in collect()
+        weakref.finalize(handle, self._reclaim_queue.append, self._handle_count(kind, handle.number))
+
+    def _track_numbers(self, owner, kind, numbers):
+        """ Count owner as a handle to each of the numbers """
+        weakref.finalize(owner, self._reclaim_queue.extend,
+                         [self._handle_count(kind, number) for number in numbers])
+
+    def _handle_count(self, kind, number):
+        """ Increase the handle count of a number. Returns the key and the count,
+        a one element list that is detached from _handles when the number is
+        removed, so handles to removed numbers never release them again """
+        key = (kind, number)
+        count = self._handles.get(key)
+        if count is None:
+            count = self._handles[key] = [0]
+        count[0] += 1
+        return key, count
+
+    @synchronized
+    def collect(self):
+        """ Delete all solutions and gas phases whose handles have been garbage
+        collected, in a single run, and make their numbers available for reuse """
+        released = {'solution': [], 'gas': []}
+        while self._reclaim_queue:
+            key, count = self._reclaim_queue.popleft()
+            count[0] -= 1
+            if count[0] == 0 and self._handles.get(key) is count:
+                del self._handles[key]
+                released[key[0]].append(key[1])
+
+        if released['solution'] or released['gas']:
+            inputstr = "DELETE \n"
+            if released['solution']:
+                inputstr += "-solution " + ' '.join(map(str, released['solution'])) + "\n"
+            if released['gas']:
+                inputstr += "-gas_phase " + ' '.join(map(str, released['gas'])) + "\n"
+            self._run(inputstr)
+            self._forget_solutions(released['solution'])
+            for kind, numbers in released.items():
+                self._release_numbers(kind, numbers)
+
+    @synchronized
+    def memory_stats(self):
+        """ Returns the number of native solutions alive (excluding the negatively
+        numbered internal PHREEQC solutions), the tracked handles and the numbers
+        pending deletion or available for reuse """
+        return {
+            'solutions': len([n for n in self.get_solution_list() if n >= 0]),
+            'solution_counter': self.solution_counter,
+            'gas_counter': self.gas_counter,
+            'handles': len(self._handles),
+            'pending': len(self._reclaim_queue),
+            'free_solutions': len(self._free_numbers['solution']),
+            'free_gases': len(self._free_numbers['gas']),
+        }
+
+    @synchronized
     def add_equilibrium_phase(self, components=[], to_si=[], amount=[]):
         self.phase_counter += 1
 
@@ -79,11 +352,12 @@ class PhreeqPython(object):
             inputstr += "{} {} {}\n".format(components[num], to_si[num], amount[num])
         
         inputstr += "SAVE EQUILIBRIUM_PHASE {}\n".format(self.phase_counter)
-        self.ip.run_string(inputstr)
+        self._run(inputstr)
 
         return EquilibriumPhase(self, self.phase_counter)
 
 
+    @synchronized
     def add_gas(self, components=None, pressure=1.0, volume=1.0, fixed_pressure=True, fixed_volume=False, equilibrate_with=False):
         """ add a gas phase to the VIPhreeqc stack """
 
@@ -93,10 +367,9 @@ class PhreeqPython(object):
         if equilibrate_with is not False and not fixed_volume:
             raise ValueError("Only gas phases with a fixed_volume can be created in equilibrium with a solution")
 
-        self.gas_counter += 1
+        number = self._new_gas_number()
 
-
-        inputstr = "GAS_PHASE {}\n".format(self.gas_counter)
+        inputstr = "GAS_PHASE {}\n".format(number)
         if fixed_pressure:
             inputstr += "-fixed_pressure \n"
         if fixed_volume:
@@ -115,43 +388,56 @@ class PhreeqPython(object):
                 inputstr += "-equilibrate {}\n".format(equilibrate_with)
 
 
-        inputstr += "SAVE GAS_PHASE "+str(self.gas_counter) + "\n"
+        inputstr += "SAVE GAS_PHASE "+str(number) + "\n"
         inputstr += "END \n"
 
-        self.ip.run_string(inputstr)
+        self._run(inputstr)
 
-        return Gas(self, self.gas_counter)
+        return Gas(self, number)
 
     def add_solution_raw(self, composition=None):
         warnings.warn("add_solution_raw is deprecated, use add_solution and add_solution_simple instead", DeprecationWarning)
         return self.add_solution(composition)
 
+    @synchronized
     def add_solution(self, composition=None, extraneous=None):
         """ add a solution to the VIPhreeqc Stack, allowing more control over the
         created solution """
 
-        self.solution_counter += 1
-        inputstr = "SOLUTION "+str(self.solution_counter) + "\n"
+        key = make_key('solution', composition)
+        number = self._from_result_cache(key)
+        if number is not None:
+            return Solution(self, number, extraneous=extraneous)
+
+        number = self._new_solution_number()
+        inputstr = "SOLUTION "+str(number) + "\n"
         if len(composition) > 0:
             for key, value in composition.items():
                 inputstr += "  "+key+" "+str(value) + "\n"
 
         if not self.chain:
-            inputstr += "SAVE SOLUTION "+str(self.solution_counter) + "\n"
+            inputstr += "SAVE SOLUTION "+str(number) + "\n"
             inputstr += "END \n"
-            self.ip.run_string(inputstr)
+            self._run(inputstr)
+            self._to_result_cache(make_key('solution', composition), number)
         else:
             self.chain_buffer += inputstr
 
-        return Solution(self, self.solution_counter, extraneous=extraneous)
+        return Solution(self, number, extraneous=extraneous)
 
+    @synchronized
     def add_solution_simple(self, composition=None, temperature=25, units='mmol'):
         """ add a solution to the VIPhreeqc Stack and add all individual components
         in a reaction step
         """
-        self.solution_counter += 1
+        key = make_key('simple', composition, temperature, units)
+        number = self._from_result_cache(key)
+        if number is not None:
+            return Solution(self, number)
+
+        number = self._new_solution_number()
 
-        inputstr = "SOLUTION "+str(self.solution_counter) + "\n"
+        inputstr = "SOLUTION "+str(number) + "\n"
         inputstr += "-temp "+str(temperature) + "\n"
         if len(composition) > 0:
             inputstr += "REACTION 1 \n"
@@ -161,20 +447,75 @@ class PhreeqPython(object):
             inputstr += "1 mmol \n"
 
         if not self.chain:
-            inputstr += "SAVE SOLUTION "+str(self.solution_counter) + "\n"
+            inputstr += "SAVE SOLUTION "+str(number) + "\n"
             inputstr += "END \n"
-            self.ip.run_string(inputstr)
+            self._run(inputstr)
+            self._to_result_cache(key, number)
         else:
             self.chain_buffer += inputstr
 
 
-        return Solution(self, self.solution_counter)
+        return Solution(self, number)
+
+    @synchronized
+    def add_solutions_from_table(self, table, units='mmol', temperature=25,
+                                 temperature_column=None, extraneous_columns=(),
+                                 chunksize=1000):
+        """ Create a solution per row of a table, like add_solution_simple. The
+        table is a pandas DataFrame, a NumPy structured array or a dict of
+        columns, with a column per chemical. Missing (NaN) amounts are skipped.
+        The temperature is taken from temperature_column if given, and the
+        extraneous_columns are kept as extraneous data. Returns a
+        SolutionCollection """
+        if self.chain:
+            raise RuntimeError("Cannot add solutions while a chain is active")
+
+        if isinstance(table, np.ndarray):
+            columns = {name: table[name] for name in table.dtype.names}
+        elif isinstance(table, dict):
+            columns = dict(table)
+        else:
+            columns = {str(name): table[name].to_numpy() for name in table.columns}
 
+        if temperature_column is not None:
+            temperatures = np.asarray(columns.pop(temperature_column), dtype=float)
+        else:
+            temperatures = None
+        extraneous = {name: columns.pop(name) for name in extraneous_columns}
+
+        # convert whole columns at once, and format them as reaction lines
+        lines = []
+        for chemical, column in columns.items():
+            amounts = convert_units_array(chemical, column, units, 'mmol')
+            lines.append(["" if np.isnan(amount) else chemical + " " + str(amount) + "\n"
+                          for amount in amounts.tolist()])
+        rows = len(lines[0]) if lines else len(temperatures) if temperatures is not None else 0
+
+        numbers = []
+        for start in range(0, rows, chunksize):
+            inputstr = ""
+            for row in range(start, min(start + chunksize, rows)):
+                number = self._new_solution_number()
+                numbers.append(number)
+                inputstr += "SOLUTION " + str(number) + "\n"
+                inputstr += "-temp " + str(temperature if temperatures is None else temperatures[row]) + "\n"
+                reaction = "".join([column[row] for column in lines])
+                if reaction:
+                    inputstr += "REACTION 1 \n" + reaction + "1 mmol \n"
+                inputstr += "SAVE SOLUTION " + str(number) + "\n"
+                inputstr += "END \n"
+            self._run(inputstr)
+
+        self._invalidate(numbers)
+        return SolutionCollection(self, numbers, extraneous)
+
+    @synchronized
     def add_master_species(self, element, master_species, alkalinity=0, gfw=1, egfw=""):
         """ add a master species to the VIPhreeqc Instance """
         inputstr = "SOLUTION_MASTER_SPECIES; {} {} {} {} {} \n".format(element, master_species, alkalinity, gfw, egfw)
         self.buffer = inputstr
 
+    @synchronized
     def add_species(self, reaction, log_k=0, delta_h=0, egfw=None):
         """ add a solution species to the VIPhreeqc Instance """
         inputstr = self.buffer if self.buffer else ""
@@ -182,10 +523,15 @@ class PhreeqPython(object):
         inputstr +=  "SOLUTION_SPECIES \n {} \n".format(reaction)
         inputstr += "log_k {}".format(log_k)
 
-        self.ip.run_string(inputstr)
+        self._run(inputstr)
+        # cached solutions were calculated with the previous database
+        self.clear_result_cache()
 
-    def change_solution(self, solution_number, elements, create_new=False):
-        """ change solution composition by adding/removing elements """
+    @synchronized
+    def change_solution(self, solution_number, elements, create_new=False, save_as=None):
+        """ change solution composition by adding/removing elements. The result
+        is saved as a new solution with create_new, or to an existing solution
+        number with save_as """
 
         inputstr = ""
 
@@ -197,18 +543,21 @@ class PhreeqPython(object):
             inputstr += element + " " + str(change) + "\n"
         inputstr += "1 mol \n"
         if create_new:
-            self.solution_counter += 1
-            solution_number = self.solution_counter
+            solution_number = self._new_solution_number()
+        elif save_as is not None:
+            solution_number = save_as
 
         if not self.chain:
             inputstr += "SAVE SOLUTION "+str(solution_number) + "\n"
             inputstr += "END"
-            self.ip.run_string(inputstr)
+            self._run(inputstr)
+            self._invalidate([solution_number])
         else:
             self.chain_buffer += inputstr
 
         return Solution(self, solution_number)
 
+    @synchronized
     def equalize_solution(self, solution_number, phases, to_si, in_phase=[10], with_element=[None]):
         """ saturate or desaturate (equalize) a solution with one or more phases """
 
@@ -249,21 +598,18 @@ class PhreeqPython(object):
         if not self.chain:
             inputstr += "SAVE SOLUTION "+str(solution_number) + "\n"
             inputstr += "END"
-            self.ip.run_string(inputstr)
+            self._run(inputstr)
+            self._invalidate([solution_number])
         else:
             self.chain_buffer += inputstr
 
         return Solution(self, solution_number)
 
+    @synchronized
     def mix_solutions(self, solutions):
         """ Create a mixture from two other solutions """
-        # add a solution to the VIPhreeqc Stack
-        self.solution_counter += 1
-        # mix two or more solutions to obtain a new solution
-        inputstr = "MIX 1 \n"
-        # set of phreeqpython IDs
-        pp_ids = set()
-
+        # the extraneous data of the parents is merged first, it may have changed
+        # since a cached mixture was created
         extraneous = {}
 
         def merge_extraneous(n, extraneous, fraction):
@@ -274,27 +620,49 @@ class PhreeqPython(object):
                 else:
                     extraneous[k] = extraneous.get(k, 0) + v * fraction
 
+        # set of phreeqpython IDs
+        pp_ids = set()
+        fractions = []
+
         for solution, fraction in solutions.items():
 
-            merge_extraneous(solution.extraneous, extraneous, fraction)
+            if isinstance(solution, Solution):
+                merge_extraneous(solution.extraneous, extraneous, fraction)
+            else:
+                merge_extraneous(self._extraneous.get(solution, {}), extraneous, fraction)
 
             if isinstance(solution, Solution):
                 pp_ids.add(solution.pp.ip.id_)
-                inputstr += str(solution.number) + " " + str(fraction) + "\n"
+                fractions.append((solution.number, fraction))
             else:
-                inputstr += str(solution) + " " + str(fraction) + "\n"
-
-        inputstr += "SAVE SOLUTION "+str(self.solution_counter) + "\n"
-        inputstr += "END \n"
+                fractions.append((solution, fraction))
 
         if len(pp_ids) > 1:
             raise ValueError('Cannot Mix solutions belonging to seperate PhreeqPython instances!')
 
-        self.ip.run_string(inputstr)
+        key = make_key('mix', sorted(fractions))
+        parents = [parent for parent, fraction in fractions]
+        number = self._from_result_cache(key)
+        if number is not None:
+            return Solution(self, number, extraneous=extraneous)
 
+        # add a solution to the VIPhreeqc Stack
+        number = self._new_solution_number()
+        # mix two or more solutions to obtain a new solution
+        inputstr = "MIX 1 \n"
+        for parent, fraction in fractions:
+            inputstr += str(parent) + " " + str(fraction) + "\n"
 
-        return Solution(self, self.solution_counter, extraneous=extraneous)
+        inputstr += "SAVE SOLUTION "+str(number) + "\n"
+        inputstr += "END \n"
 
+        self._run(inputstr)
+        self._invalidate([number])
+        self._to_result_cache(key, number, parents)
+
+        return Solution(self, number, extraneous=extraneous)
+
+    @synchronized
     def interact_solution_gas(self, solution_number, gas_number):
         """ Interact solution with gas phase """
         inputstr = "USE SOLUTION " + str(solution_number) + "\n"
@@ -302,8 +670,10 @@ class PhreeqPython(object):
         inputstr += "SAVE GAS_PHASE " + str(gas_number) + "\n"
         inputstr += "SAVE SOLUTION " + str(solution_number) + "\n"
         inputstr += "END"
-        self.ip.run_string(inputstr)
+        self._run(inputstr)
+        self._invalidate([solution_number])
 
+    @synchronized
     def interact_solution_phase(self, solution_number, phase_number):
         """ Interact solution with equilibrium phase """
         inputstr = "USE SOLUTION " + str(solution_number) + "\n"
@@ -311,9 +681,11 @@ class PhreeqPython(object):
         inputstr += "SAVE EQUILIBRIUM_PHASE " + str(phase_number) + "\n"
         inputstr += "SAVE SOLUTION " + str(solution_number) + "\n"
         inputstr += "END"
-        self.ip.run_string(inputstr)
+        self._run(inputstr)
+        self._invalidate([solution_number])
 
 
+    @synchronized
     def change_solution_temperature(self, solution_number, temperature):
         """ change temperature """
         inputstr = "USE SOLUTION " + str(solution_number) + "\n"
@@ -321,53 +693,191 @@ class PhreeqPython(object):
         inputstr += str(temperature) + "\n"
         inputstr += "SAVE SOLUTION "+str(solution_number) + "\n"
 
-        self.ip.run_string(inputstr)
-        return Solution(self, self.solution_counter)
+        self._run(inputstr)
+        self._invalidate([solution_number])
+        return Solution(self, solution_number)
 
+    @synchronized
     def copy_solution(self, solution_number):
         """ Copy a solution to create a new one """
         # add a solution to the VIPhreeqc Stack
-        self.solution_counter += 1
+        number = self._new_solution_number()
         # mix two or more solutions to obtain a new solution
-        inputstr = "COPY SOLUTION " + str(solution_number) + " " + str(self.solution_counter) + "\n"
+        inputstr = "COPY SOLUTION " + str(solution_number) + " " + str(number) + "\n"
         inputstr += "END\n"
 
-        self.ip.run_string(inputstr)
+        self._run(inputstr)
+        self._invalidate([number])
+        # copies of solutions loaded without calculation are not calculated either
+        if solution_number in self._stale:
+            self._stale.add(number)
+            if solution_number in self._precomputed:
+                self._precomputed[number] = self._precomputed[solution_number]
 
-        return Solution(self, self.solution_counter)
+        return Solution(self, number)
 
+    @synchronized
     def copy_gas(self, gas_number):
         """ Copy a solution to create a new one """
         # add a solution to the VIPhreeqc Stack
-        self.gas_counter += 1
+        number = self._new_gas_number()
         # mix two or more solutions to obtain a new solution
-        inputstr = "COPY GAS_PHASE " + str(gas_number) + " " + str(self.gas_counter) + "\n"
+        inputstr = "COPY GAS_PHASE " + str(gas_number) + " " + str(number) + "\n"
         inputstr += "END\n"
 
-        self.ip.run_string(inputstr)
+        self._run(inputstr)
 
-        return Gas(self, self.gas_counter)
+        return Gas(self, number)
 
     def empty_solution(self):
         return self.add_solution({})
 
+    @synchronized
     def remove_solutions(self, solution_number_list):
         """ Remove solutions from VIPhreeqc memory """
         inputstr = "DELETE \n"
         inputstr += "-solution " + ' '.join(map(str, solution_number_list))
-        self.ip.run_string(inputstr)
+        self._run(inputstr)
+        self._forget_solutions(solution_number_list)
 
+    def _forget_solutions(self, numbers):
+        """ Drop all data kept for removed solutions """
+        self._invalidate(numbers)
+        for number in numbers:
+            self._extraneous.pop(number, None)
+            self._handles.pop(('solution', number), None)
+
+    @synchronized
     def remove_gases(self, gas_number_list):
         """ Remove solutions from VIPhreeqc memory """
         inputstr = "DELETE \n"
         inputstr += "-gas_phase " + ' '.join(map(str, gas_number_list))
-        self.ip.run_string(inputstr)
+        self._run(inputstr)
+        for number in gas_number_list:
+            self._handles.pop(('gas', number), None)
+
+    @synchronized
+    def clear(self):
+        """ Remove all solutions, gas phases and equilibrium phases from VIPhreeqc
+        memory and reset the counters """
+        if self._batch is not None or self.chain:
+            raise RuntimeError("Cannot clear while a batch or chain is active")
+        self.ip.run_string("DELETE \n-all\nEND\n")
+        self.solution_counter = -1
+        self.gas_counter = -1
+        self.phase_counter = -1
+        self._reclaim_queue.clear()
+        self._handles = {}
+        self._free_numbers = {'solution': set(), 'gas': set()}
+        self._extraneous = {}
+        self._precomputed = {}
+        self._stale = set()
+        # versions are kept, so they keep increasing when numbers are reused
+        self._versions.update((n, v + 1) for n, v in self._versions.items())
+        self._property_cache = {}
+        if self.result_cache is not None:
+            self.result_cache.clear()
+
+    @synchronized
+    def save_checkpoint(self, filename, compresslevel=6, results=True):
+        """ Save the complete state (all solutions, gas phases and equilibrium
+        phases, counters and extraneous data) to a binary checkpoint file. With
+        results, the scalar solution properties are stored as well, so they can
+        be read after loading without speciating the solutions again. A
+        compresslevel of 0 writes an uncompressed file """
+        if self._batch is not None:
+            raise RuntimeError("Cannot save a checkpoint while a batch is active")
+
+        self.ip.set_dump_string_on()
+        try:
+            self.ip.run_string("DUMP \n-all\nEND\n")
+            dump = self.ip.get_dump_string().decode('utf-8')
+        finally:
+            self.ip.set_dump_string_off()
+
+        state = {
+            'version': CHECKPOINT_VERSION,
+            'database': self.database,
+            'dump': dump,
+            'solution_counter': self.solution_counter,
+            'gas_counter': self.gas_counter,
+            'phase_counter': self.phase_counter,
+            'free_numbers': self._free_numbers,
+            'extraneous': self._extraneous,
+            'results': None,
+        }
+        if results:
+            numbers = [n for n in self.get_solution_list()
+                       if n >= 0 and (n not in self._stale or n in self._precomputed)]
+            state['results'] = (np.array(numbers, dtype=int), self.snapshot(numbers))
+
+        if compresslevel:
+            checkpoint = gzip.open(filename, 'wb', compresslevel=compresslevel)
+        else:
+            checkpoint = open(filename, 'wb')
+        with checkpoint:
+            pickle.dump(state, checkpoint, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @synchronized
+    def load_checkpoint(self, filename):
+        """ Replace the state of this instance with a checkpoint written by
+        save_checkpoint. Loaded solutions are speciated on first use, unless
+        their results were stored in the checkpoint. Checkpoints are pickles,
+        only load files from trusted sources """
+        with open(filename, 'rb') as checkpoint:
+            compressed = checkpoint.read(2) == b'\x1f\x8b'
+        with (gzip.open if compressed else open)(filename, 'rb') as checkpoint:
+            state = pickle.load(checkpoint)
+
+        if state['version'] != CHECKPOINT_VERSION:
+            raise ValueError("Unsupported checkpoint version %s" % state['version'])
+        if state['database'] != self.database:
+            warnings.warn("Checkpoint was saved with database %s" % state['database'])
+        if self._batch is not None or self.chain:
+            raise RuntimeError("Cannot load a checkpoint while a batch or chain is active")
+
+        self.clear()
+        self.ip.run_string(state['dump'] + "END\n")
+        self.solution_counter = state['solution_counter']
+        self.gas_counter = state['gas_counter']
+        self.phase_counter = state['phase_counter']
+        self._free_numbers = state['free_numbers']
+        self._extraneous = state['extraneous']
+        # solutions defined from the dump are not speciated yet, whether or not
+        # they were stale when the checkpoint was saved
+        self._stale = set(n for n in self.ip.get_solution_list() if n >= 0)
+        if state['results'] is not None:
+            numbers, values = state['results']
+            self._precomputed = dict(zip(numbers.tolist(), values))
 
     def get_solution(self, number):
         return Solution(self, number)
 
+    @synchronized
+    def close(self):
+        """ Release the VIPhreeqc instance. Unless the database was modified, the
+        emptied instance is kept for reuse by the next PhreeqPython instance """
+        if self.ip is None:
+            return
+        if self._database_key:
+            dbcache.release_instance(self._database_key, self.ip)
+        else:
+            self.ip.destroy_iphreeqc()
+        self.ip = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    @synchronized
     def dump_solutions(self, solution_number_list = None, filename='dump.gz'):
         """ Dump solutions to raw file for transmission to another VIPhreeqc instance """
+        if self._batch is not None:
+            raise RuntimeError("Cannot dump solutions while a batch is active")
+
         if not solution_number_list:
             solution_number_list = []
 
@@ -388,17 +898,367 @@ class PhreeqPython(object):
 
         self.ip.set_dump_string_off()
     
+    @synchronized
     def start_chain(self, number):
+        if self._batch is not None:
+            raise RuntimeError("Cannot start a chain while a batch is active")
+        # the lock is held until end(), so other threads cannot add their input
+        # to the chain
+        if not self.chain:
+            self.lock.acquire()
         self.chain = True
         self.chain_buffer = "USE SOLUTION "+str(number) + "\n" 
 
+    @synchronized
     def end(self):
-        self.chain = False
-        inputstr = "SAVE SOLUTION "+str(self.solution_counter) + "\n"
-        inputstr += "END \n"
-        self.ip.run_string(self.chain_buffer + inputstr)
+        chained, self.chain = self.chain, False
+        try:
+            inputstr = "SAVE SOLUTION "+str(self.solution_counter) + "\n"
+            inputstr += "END \n"
+            self.ip.run_string(self.chain_buffer + inputstr)
+            self._invalidate([self.solution_counter])
+        finally:
+            if chained:
+                self.lock.release()
 
 
+    @synchronized
     def get_solution_list(self):
         return self.ip.get_solution_list()
 
+    @synchronized
+    def snapshot(self, solutions):
+        """ Returns the scalar properties (pH, pe, sc, I, temperature, mass, volume
+        and density) of a list of solutions as a NumPy structured array """
+        numbers = [s.number if isinstance(s, Solution) else s for s in solutions]
+        self.recalculate([n for n in numbers if n not in self._precomputed])
+        result = np.array(self.ip.get_solutions_properties(numbers),
+                          dtype=[(name, float) for name in SOLUTION_PROPERTIES])
+        if self._precomputed:
+            for row, number in enumerate(numbers):
+                if number in self._precomputed:
+                    result[row] = self._precomputed[number]
+        return result
+
+    @synchronized
+    def extract(self, solutions, outputs):
+        """ Returns outputs (see Solution.get) of a list of solutions as a NumPy
+        structured array with a field per output. Scalar properties and
+        saturation indices are read in bulk """
+        solutions = [s if isinstance(s, Solution) else Solution(self, s) for s in solutions]
+        numbers = [s.number for s in solutions]
+        result = np.empty(len(solutions), dtype=[(output, float) for output in outputs])
+
+        properties = [output for output in outputs if output in SOLUTION_PROPERTIES]
+        if properties:
+            values = self.snapshot(numbers)
+            for output in properties:
+                result[output] = values[output]
+
+        phases = [output for output in outputs if output.startswith('si:')]
+        if phases:
+            si = self.si_matrix(numbers, [output[3:] for output in phases])
+            for column, output in enumerate(phases):
+                result[output] = si[:, column]
+
+        for output in outputs:
+            if output not in properties and output not in phases:
+                result[output] = [solution.get(output) for solution in solutions]
+        return result
+
+    def stream(self, rows, ops=(), outputs=('pH',), units='mmol', temperature=25,
+               chunksize=1000, batch_ops=True):
+        """ Evaluate a (possibly endless) iterable of compositions in chunks with
+        bounded memory. Every chunk of solutions is created with
+        add_solution_simple, passed through the ops (callables taking a
+        solution), its outputs are extracted and all solutions created for the
+        chunk are removed again. Yields a result record per row.
+
+        With batch_ops, each op is run as a single batch over the whole chunk,
+        so an op should not read properties that it changed itself """
+        rows = iter(rows)
+        while True:
+            chunk = list(itertools.islice(rows, chunksize))
+            if not chunk:
+                return
+            with self.lock:
+                self._allocated = allocated = []
+                try:
+                    with self.batch():
+                        solutions = [self.add_solution_simple(row, temperature, units)
+                                     for row in chunk]
+                    for op in ops:
+                        with self.batch() if batch_ops else contextlib.nullcontext():
+                            for solution in solutions:
+                                op(solution)
+                    records = self.extract(solutions, outputs)
+                finally:
+                    self._allocated = None
+                    # remove all solutions created for the chunk and reuse their numbers
+                    if allocated:
+                        self.remove_solutions(allocated)
+                        self._release_numbers('solution', allocated)
+            yield from records
+
+    @synchronized
+    def punch(self, solutions, outputs=('pH',), as_frame=False):
+        """ Returns outputs of a list of solutions, calculated by PHREEQC itself
+        with a USER_PUNCH block and read back as one table. Supports the scalar
+        properties and 'si', 'sr', 'total_element', 'activity', 'molality' and
+        'moles' outputs (see Solution.get). Returns a NumPy structured array,
+        or a pandas DataFrame indexed by solution number with as_frame """
+        if self._batch is not None or self.chain:
+            raise RuntimeError("Cannot punch while a batch or chain is active")
+
+        numbers = [s.number if isinstance(s, Solution) else s for s in solutions]
+        for output in outputs:
+            if self._punch_expression(output) is None:
+                raise ValueError("Output '%s' is not supported by punch" % output)
+
+        # mixing a solution with itself recalculates it without saving it
+        values = self._punch_mixtures(["{} 1\n".format(number) for number in numbers], outputs)
+
+        if as_frame:
+            try:
+                import pandas as pd
+            except ImportError as exc:
+                raise ImportError(
+                    "as_frame requires pandas. Install with "
+                    "'pip install phreeqpython[pandas]' or install pandas manually."
+                ) from exc
+            return pd.DataFrame(values, index=numbers, columns=list(outputs))
+
+        result = np.empty(len(numbers), dtype=[(output, float) for output in outputs])
+        for column, output in enumerate(outputs):
+            result[output] = values[:, column]
+        return result
+
+    @staticmethod
+    def _punch_expression(output):
+        """ Returns the BASIC expression of an output, or None if punch does not
+        support it """
+        name, _, argument = output.partition(':')
+        if name not in PUNCH_EXPRESSIONS or bool(argument) != ('{}' in PUNCH_EXPRESSIONS[name]):
+            return None
+        return PUNCH_EXPRESSIONS[name].format(argument)
+
+    def _punch_mixtures(self, mixtures, outputs):
+        """ Calculate a MIX block per mixture (its solution and fraction lines)
+        without saving it, and return the punched outputs as a 2-D array """
+        expressions = [self._punch_expression(output) for output in outputs]
+
+        # the punch definitions are inactive after use and redefined before every
+        # use, so they do not count as a database change (see dbcache)
+        modified = self.ip.database_modified
+        try:
+            # the selected output has to exist before its string can be turned on
+            self.ip.run_string("SELECTED_OUTPUT {}\n-active false\nEND\n".format(PUNCH_USER_NUMBER))
+            self.ip.set_current_selected_output_user_number(PUNCH_USER_NUMBER)
+            self.ip.set_selected_output_string_on()
+
+            inputstr = "SELECTED_OUTPUT {}\n-reset false\n-high_precision true\n-active true\n".format(PUNCH_USER_NUMBER)
+            inputstr += "USER_PUNCH {}\n".format(PUNCH_USER_NUMBER)
+            inputstr += "-headings " + " ".join("c%d" % i for i in range(len(outputs))) + "\n"
+            inputstr += "10 PUNCH " + ", ".join(expressions) + "\nEND\n"
+            for mixture in mixtures:
+                inputstr += "MIX 1\n" + mixture + "END\n"
+            inputstr += "SELECTED_OUTPUT {}\n-active false\nEND\n".format(PUNCH_USER_NUMBER)
+            try:
+                self.ip.run_string(inputstr)
+                values = self.ip.get_selected_output_table()[1]
+            except Exception:
+                self.ip.run_string("SELECTED_OUTPUT {}\n-active false\nEND\n".format(PUNCH_USER_NUMBER))
+                raise
+            finally:
+                self.ip.set_selected_output_string_off()
+                self.ip.set_current_selected_output_user_number(1)
+        finally:
+            self.ip.database_modified = modified
+        return values
+
+    @synchronized
+    def mix_many(self, sources, fractions, outputs=('pH',)):
+        """ Evaluate outputs (see Solution.get) of many mixtures of the same
+        source solutions in a single run. fractions is a 2-D array with a row
+        of mixing fractions (one per source) per mixture. Returns a NumPy
+        structured array with a record per mixture; no solutions are kept """
+        if self._batch is not None or self.chain:
+            raise RuntimeError("Cannot mix while a batch or chain is active")
+
+        numbers = [s.number if isinstance(s, Solution) else s for s in sources]
+        fractions = np.atleast_2d(np.asarray(fractions, dtype=float))
+        if fractions.shape[1] != len(numbers):
+            raise ValueError("Expected %d fractions per mixture, got %d" % (len(numbers), fractions.shape[1]))
+        if not np.all(np.isfinite(fractions)):
+            raise ValueError("Fractions should be finite numbers")
+        empty = np.flatnonzero(~fractions.any(axis=1))
+        if empty.size:
+            raise ValueError("Mixture %d has no non-zero fractions" % empty[0])
+
+        mixtures = ["".join(["{} {}\n".format(number, fraction)
+                             for number, fraction in zip(numbers, row) if fraction])
+                    for row in fractions.tolist()]
+
+        if all(self._punch_expression(output) is not None for output in outputs):
+            values = self._punch_mixtures(mixtures, outputs)
+            result = np.empty(len(mixtures), dtype=[(output, float) for output in outputs])
+            for column, output in enumerate(outputs):
+                result[output] = values[:, column]
+            return result
+
+        # other outputs are read from temporary solutions
+        temporary = [self._new_solution_number() for _ in mixtures]
+        try:
+            self.ip.run_string("".join(["MIX 1\n{}SAVE SOLUTION {}\nEND\n".format(mixture, number)
+                                        for mixture, number in zip(mixtures, temporary)]))
+            self._invalidate(temporary)
+            return self.extract(temporary, outputs)
+        finally:
+            self.remove_solutions(temporary)
+            self._release_numbers('solution', temporary)
+
+    @synchronized
+    def blend_curve(self, solution1, solution2, fractions, outputs=('pH',), compare=False):
+        """ Evaluate outputs of blends of two solutions, for increasing fractions
+        (0 to 1) of solution2. Every blend is mixed from the previous blend and
+        solution2, so PHREEQC starts from a nearly converged estimate. Supports
+        the outputs of punch. With compare, the blends are also calculated from
+        scratch to report the iterations saved. Returns a BlendCurve """
+        if self._batch is not None or self.chain:
+            raise RuntimeError("Cannot blend while a batch or chain is active")
+
+        fractions = np.asarray(fractions, dtype=float)
+        if np.any(np.diff(fractions) < 0) or np.any((fractions < 0) | (fractions > 1)):
+            raise ValueError("Fractions should be increasing values between 0 and 1")
+        outputs = list(outputs)
+        for output in outputs:
+            if self._punch_expression(output) is None:
+                raise ValueError("Output '%s' is not supported by blend_curve" % output)
+
+        number1 = solution1.number if isinstance(solution1, Solution) else solution1
+        number2 = solution2.number if isinstance(solution2, Solution) else solution2
+
+        # blend k = (1 - beta) * blend k-1 + beta * solution2, with
+        # beta = (f_k - f_k-1) / (1 - f_k-1)
+        blend = self._new_solution_number()
+        mixtures = []
+        previous = None
+        for fraction in fractions.tolist():
+            if previous is None:
+                mixture = "{} {}\n{} {}\n".format(number1, 1 - fraction, number2, fraction)
+            else:
+                beta = (fraction - previous) / (1 - previous) if previous < 1 else 1
+                mixture = "{} {}\n{} {}\n".format(blend, 1 - beta, number2, beta)
+            mixtures.append(mixture + "SAVE SOLUTION {}\n".format(blend))
+            previous = fraction
+        try:
+            values = self._punch_mixtures(mixtures, outputs + ['iterations'])
+        finally:
+            self.remove_solutions([blend])
+            self._release_numbers('solution', [blend])
+
+        cold_iterations = None
+        if compare:
+            cold = self._punch_mixtures(["{} {}\n{} {}\n".format(number1, 1 - fraction, number2, fraction)
+                                         for fraction in fractions.tolist()], ['iterations'])
+            cold_iterations = cold[:, 0].astype(int)
+
+        result = np.empty(len(fractions), dtype=[(output, float) for output in outputs])
+        for column, output in enumerate(outputs):
+            result[output] = values[:, column]
+        return BlendCurve(fractions, result, values[:, -1].astype(int), cold_iterations)
+
+    @synchronized
+    def sweep(self, solution, parameters, outputs=('pH',), units='mmol',
+              with_chemical=None):
+        """ Evaluate outputs (see Solution.get) of a solution for every
+        combination of parameter values, without changing the solution.
+        parameters maps a chemical (dosed in units), 'temperature' or 'pH'
+        (fixed with HCl or NaOH, or with_chemical) to a sequence of values.
+        Returns a NumPy structured array with one dimension per parameter """
+        if self._batch is not None or self.chain:
+            raise RuntimeError("Cannot sweep while a batch or chain is active")
+
+        source = solution.number if isinstance(solution, Solution) else solution
+        names = list(parameters)
+        axes = [np.atleast_1d(np.asarray(parameters[name], dtype=float)) for name in names]
+        shape = tuple(len(axis) for axis in axes)
+        columns = dict(zip(names, (g.ravel() for g in np.meshgrid(*axes, indexing='ij'))))
+
+        chemicals = {name: convert_units_array(name, column, units, 'mol')
+                     for name, column in columns.items() if name not in ('temperature', 'pH')}
+        temperatures = columns.get('temperature')
+        pHs = columns.get('pH')
+
+        numbers = [self._new_solution_number() for _ in range(int(np.prod(shape)))]
+        try:
+            start = [source] * len(numbers)
+            if chemicals or temperatures is not None:
+                inputstr = ""
+                for i, number in enumerate(numbers):
+                    inputstr += "USE SOLUTION {}\n".format(source)
+                    if chemicals:
+                        inputstr += "REACTION 1\n"
+                        for chemical, amounts in chemicals.items():
+                            inputstr += "{} {}\n".format(chemical, amounts[i])
+                        inputstr += "1 mol\n"
+                    if temperatures is not None:
+                        inputstr += "REACTION_TEMPERATURE 1\n{}\n".format(temperatures[i])
+                    inputstr += "SAVE SOLUTION {}\nEND\n".format(number)
+                self.ip.run_string(inputstr)
+                start = numbers
+
+            if pHs is not None:
+                # the pH is fixed in a second run, after the doses are known
+                start_pHs = self.snapshot(start)['pH']
+                inputstr = ""
+                for i, number in enumerate(numbers):
+                    chemical = with_chemical or ("HCl" if pHs[i] < start_pHs[i] else "NaOH")
+                    inputstr += "USE SOLUTION {}\n".format(start[i])
+                    inputstr += "EQUILIBRIUM_PHASES 1\n"
+                    inputstr += "Fix_pH {} {} 10\n".format(-pHs[i], chemical)
+                    inputstr += "SAVE SOLUTION {}\nEND\n".format(number)
+                self.ip.run_string(inputstr)
+
+            self._invalidate(numbers)
+            result = self.extract(numbers, outputs)
+        finally:
+            self.remove_solutions(numbers)
+            self._release_numbers('solution', numbers)
+        return result.reshape(shape)
+
+    def kinetics(self, solutions, element, rate_function, time, m0=0, args=(),
+                 method='LSODA', apply=False, **options):
+        """ Integrate the same kinetic reaction for a list of solutions at once.
+        Returns the amount reacted (mmol) as an array of shape
+        (n_solutions, n_times). With apply, the final amounts are added to the
+        solutions """
+        require_scipy()
+
+        solver = BatchKineticsSolver(solutions, element, rate_function, m0, args)
+        try:
+            y = solver.solve(time, method, **options)
+        finally:
+            solver.close()
+
+        if apply:
+            with self.batch():
+                for solution, amount in zip(solutions, y[:, -1]):
+                    solution.add(element, amount)
+        return y
+
+    @synchronized
+    def si_matrix(self, solutions, phases=None):
+        """ Returns the saturation indices of a list of phases in a list of
+        solutions as a 2-D NumPy array (solutions x phases). When no phases are
+        given, the phases of the first solution are used """
+        numbers = [s.number if isinstance(s, Solution) else s for s in solutions]
+        self.recalculate(numbers)
+        if phases is None:
+            phases = self.ip.get_phases(numbers[0]) if numbers else []
+        elif isinstance(phases, str):
+            phases = [phases]
+        else:
+            phases = list(phases)
+        return self.ip.get_si_matrix(numbers, phases)
+
@@ -0,0 +1,98 @@
+import multiprocessing
+
+import numpy as np
+
+from .phreeqpython import PhreeqPython
+from .solution import Solution
+
+# PhreeqPython instance of the current worker process
+_worker_pp = None
+
+def _init_worker(database, database_directory):
+    global _worker_pp
+    _worker_pp = PhreeqPython(database=database, database_directory=database_directory)
+
+def _evaluate(task):
+    """ Evaluate a single composition or scenario in a worker process """
+    function, item, outputs, units, temperature = task
+    pp = _worker_pp
+    try:
+        if function is None:
+            result = pp.add_solution_simple(item, temperature=temperature, units=units)
+        else:
+            result = function(pp, item)
+        if isinstance(result, Solution):
+            result = {output: result.get(output) for output in outputs}
+    finally:
+        # every task starts with an empty VIPhreeqc instance
+        pp.clear()
+    return result
+
+def _evaluate_indexed(task):
+    index, task = task
+    return index, _evaluate(task)
+
+class PhreeqPool(object):
+    """ Pool of worker processes, each running its own PhreeqPython instance
+
+    Items are either compositions, which are added with add_solution_simple,
+    or arbitrary scenario items passed to `function(pp, item)`. When the
+    scenario returns a Solution, the requested outputs (see Solution.get) are
+    extracted from it, otherwise its return value is passed on unchanged.
+    Scenario functions must be picklable, i.e. defined at module level.
+    """
+
+    def __init__(self, processes=None, database=None, database_directory=None):
+        self.processes = processes or multiprocessing.cpu_count()
+        self.pool = multiprocessing.Pool(self.processes, initializer=_init_worker,
+                                         initargs=(database, database_directory))
+
+    def _tasks(self, items, function, outputs, units, temperature):
+        outputs = tuple(outputs)
+        return [(function, item, outputs, units, temperature) for item in items]
+
+    def _chunksize(self, n_items, chunksize):
+        if chunksize:
+            return chunksize
+        chunksize, extra = divmod(n_items, self.processes * 4)
+        return chunksize + 1 if extra else max(chunksize, 1)
+
+    def map(self, items, function=None, outputs=('pH',), units='mmol',
+            temperature=25, chunksize=None, as_array=False):
+        """ Evaluate all items and return a list of result dicts, or a NumPy
+        structured array with a field per output when as_array is set """
+        tasks = self._tasks(items, function, outputs, units, temperature)
+        results = self.pool.map(_evaluate, tasks, self._chunksize(len(tasks), chunksize))
+        if as_array:
+            return np.array([tuple(result[output] for output in outputs) for result in results],
+                            dtype=[(output, float) for output in outputs])
+        return results
+
+    def imap(self, items, function=None, outputs=('pH',), units='mmol',
+             temperature=25, chunksize=1, ordered=True):
+        """ Lazily evaluate all items. Yields result dicts in input order, or
+        (index, result) tuples in completion order when ordered is False """
+        tasks = self._tasks(items, function, outputs, units, temperature)
+        if ordered:
+            return self.pool.imap(_evaluate, tasks, chunksize)
+        return self.pool.imap_unordered(_evaluate_indexed, enumerate(tasks), chunksize)
+
+    def close(self):
+        """ Stop the worker processes after all pending work is done """
+        self.pool.close()
+        self.pool.join()
+
+    def terminate(self):
+        """ Stop the worker processes immediately """
+        self.pool.terminate()
+        self.pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.terminate()
+        return False
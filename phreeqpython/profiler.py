@@ -0,0 +1,57 @@
+""" Instrumentation of the calls into the VIPhreeqc library
+
+VIPhreeqc.add_hook installs a hook that is called with a CallEvent after every
+call into the library. Calls are only timed while hooks are installed, without
+hooks the library functions are called directly. A Profiler is a hook that
+aggregates the events per method:
+
+    with pp.profile() as profiler:
+        sol = pp.add_solution_simple({'NaCl': 1})
+        sol.pH
+    print(profiler)
+"""
+
+import collections
+
+CallEvent = collections.namedtuple('CallEvent', ['method', 'start', 'duration',
+                                                 'input_size', 'error'])
+CallEvent.__doc__ = """ A call into the VIPhreeqc library: the library method
+(e.g. 'run_string'), its start time and duration (time.perf_counter seconds),
+the size of its string arguments in bytes and whether it failed """
+
+class Profiler(object):
+    """ Hook that collects call counts, wall time, input size and errors per
+    VIPhreeqc library method """
+
+    def __init__(self):
+        self.stats = {}
+
+    def __call__(self, event):
+        stats = self.stats.get(event.method)
+        if stats is None:
+            stats = self.stats[event.method] = {'calls': 0, 'time': 0.0,
+                                                'input_size': 0, 'errors': 0}
+        stats['calls'] += 1
+        stats['time'] += event.duration
+        stats['input_size'] += event.input_size
+        stats['errors'] += event.error
+
+    @property
+    def total_time(self):
+        """ Wall time spent in all library calls """
+        return sum(stats['time'] for stats in self.stats.values())
+
+    def report(self, sort='time'):
+        """ Returns (method, stats) pairs, in descending order of sort """
+        return sorted(self.stats.items(), key=lambda item: item[1][sort], reverse=True)
+
+    def reset(self):
+        self.stats = {}
+
+    def __str__(self):
+        lines = ["{:<40} {:>10} {:>12} {:>12} {:>8}".format(
+            'method', 'calls', 'time (s)', 'input (B)', 'errors')]
+        for method, stats in self.report():
+            lines.append("{:<40} {:>10} {:>12.6f} {:>12} {:>8}".format(
+                method, stats['calls'], stats['time'], stats['input_size'], stats['errors']))
+        return "\n".join(lines)
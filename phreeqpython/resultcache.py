@@ -0,0 +1,96 @@
+""" LRU cache of equilibrated solutions, keyed on their definition
+
+Every entry maps a canonical key (the operation and its arguments) to a hidden
+master solution owned by the cache. PhreeqPython returns copies of the master
+solution on a hit, so the master is never changed by the caller. Entries of
+mixtures depend on the numbers of their parent solutions and are dropped when
+one of the parents is changed or removed.
+"""
+
+import collections
+
+CacheInfo = collections.namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+def make_key(*parts):
+    """ Returns a hashable, order independent key of a solution definition """
+    return tuple(_freeze(part) for part in parts)
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+class ResultCache(object):
+    """ Maps solution definitions to master solution numbers """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._keys = {}
+        self._dependents = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """ Returns the master solution number of key, or None """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key, master, parents=()):
+        """ Store a master solution number. Returns the master numbers of the
+        evicted entries, which are no longer owned by the cache """
+        evicted = self._pop(key)
+        self._entries[key] = (master, tuple(parents))
+        self._keys[master] = key
+        for parent in parents:
+            self._dependents.setdefault(parent, set()).add(key)
+        while len(self._entries) > self.maxsize:
+            evicted += self._pop(next(iter(self._entries)))
+        return evicted
+
+    def invalidate(self, numbers):
+        """ Drop the entries that are stored in, or depend on, one of the given
+        solution numbers. Returns the master numbers of the dropped entries """
+        dropped = []
+        for number in numbers:
+            if number in self._keys:
+                dropped += self._pop(self._keys[number])
+            for key in self._dependents.pop(number, ()):
+                dropped += self._pop(key)
+        return dropped
+
+    def clear(self):
+        """ Forget all entries. Returns the master numbers of the entries """
+        masters = list(self._keys)
+        self._entries.clear()
+        self._keys.clear()
+        self._dependents.clear()
+        return masters
+
+    def info(self):
+        """ Returns the hits, misses, maximum and current size of the cache """
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._entries))
+
+    def _pop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return []
+        master, parents = entry
+        del self._keys[master]
+        for parent in parents:
+            dependents = self._dependents.get(parent)
+            if dependents is not None:
+                dependents.discard(key)
+                if not dependents:
+                    del self._dependents[parent]
+        return [master]
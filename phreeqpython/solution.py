@@ -5,17 +5,97 @@ from .utility import convert_units
 
 from .equilibriumphase import EquilibriumPhase
 from .gas import Gas 
+from .kinetics import KineticsSolver, require_scipy
+from .viphreeqc import VIPhreeqc
 
 import numpy as np
 
+# solution methods that can be requested as 'method:argument' outputs
+OUTPUT_METHODS = ('si', 'sr', 'total', 'total_element', 'activity', 'moles',
+                  'molality')
+
+# VIPhreeqc getters of the scalar solution properties
+SCALAR_GETTERS = {
+    'pH': VIPhreeqc.get_ph,
+    'pe': VIPhreeqc.get_pe,
+    'sc': VIPhreeqc.get_sc,
+    'I': VIPhreeqc.get_mu,
+    'temperature': VIPhreeqc.get_temperature,
+    'mass': VIPhreeqc.get_mass,
+    'volume': VIPhreeqc.get_volume,
+    'density': VIPhreeqc.get_density,
+}
+
 class Solution(object):
     """ PhreeqPy Solution Class """
 
+    # solutions are lightweight handles, their extraneous data is kept by the
+    # PhreeqPython instance
+    __slots__ = ('pp', 'factor', 'number', '__weakref__')
+
     def __init__(self, phreeqpython, number, extraneous=None):
         self.pp = phreeqpython
         self.factor = 1
         self.number = number
-        self.extraneous = {} if extraneous is None else extraneous
+        if extraneous is not None:
+            self.extraneous = extraneous
+        if phreeqpython.reclaim:
+            phreeqpython._track(self, 'solution')
+
+    @property
+    def extraneous(self):
+        """ User data that is carried along with the solution, and mixed
+        proportionally when mixing solutions. Shared by all handles to the same
+        solution number """
+        extraneous = self.pp._extraneous.get(self.number)
+        if extraneous is None:
+            extraneous = self.pp._extraneous[self.number] = {}
+        return extraneous
+
+    @extraneous.setter
+    def extraneous(self, extraneous):
+        self.pp._extraneous[self.number] = extraneous
+
+    @property
+    def _ip(self):
+        """ VIPhreeqc instance, after speciating the solution if it was loaded
+        without calculation """
+        if self.number in self.pp._stale:
+            self.pp.recalculate([self.number])
+        return self.pp.ip
+
+    @property
+    def version(self):
+        """ Counter that increases every time the solution is changed """
+        return self.pp._versions.get(self.number, 0)
+
+    def _read(self, getter, *args):
+        """ Call a VIPhreeqc getter for this solution while holding the instance lock """
+        with self.pp.lock:
+            return getattr(self._ip, getter)(self.number, *args)
+
+    def _cached(self, name, compute):
+        """ Returns a property from the property cache, or computes and caches it """
+        pp = self.pp
+        # the lookup, the calculation and the store must not interleave with
+        # changes made to the solution from another thread
+        with pp.lock:
+            cache = pp._property_cache.get(self.number)
+            if cache is not None and name in cache:
+                return cache[name]
+            value = compute()
+            # operations queued in a batch or chain have not been applied yet
+            if pp.cache_properties and pp._batch is None and not pp.chain:
+                pp._property_cache.setdefault(self.number, {})[name] = value
+            return value
+
+    def _scalar(self, name):
+        """ Returns a scalar property, from the precomputed results if available """
+        with self.pp.lock:
+            precomputed = self.pp._precomputed.get(self.number)
+            if precomputed is not None:
+                return float(precomputed[name])
+            return self._cached(name, lambda: SCALAR_GETTERS[name](self._ip, self.number))
 
     def copy(self):
         """ Create a new copy, with unique solution number, from this solution """
@@ -111,41 +191,41 @@ class Solution(object):
 
     def total(self, element, units='mmol'):
         """ Returns to total of any given species or element """
-        amount = self.pp.ip.get_total_ion(self.number, element)
+        amount = self._read('get_total_ion', element)
         return convert_units(element, amount, to_units=units)
 
     def total_activity(self, element, units='mmol'):
         """ Returns to total of any given species or element (SLOW!) """
         total = 0
-        regexp = "(^|[^A-Z])"+element
-        for species, amount in self.species_activities.items():
-            if re.search(regexp, species):
+        regexp = re.compile("(^|[^A-Z])"+element)
+        for species, amount in zip(*self.species_array('activities')):
+            if regexp.search(species):
                 total += convert_units(element, amount, to_units=units)
         return total
 
     def total_element(self, element, units='mmol'):
         """ Returns to total any given element (FAST!) """
-        return convert_units(element, self.pp.ip.get_total_element(self.number, element), 'mol', units)
+        return convert_units(element, self._read('get_total_element', element), 'mol', units)
 
     def activity(self, species, units='mmol'):
         """ Returns the activity of a single species """
-        return convert_units(species, self.pp.ip.get_activity(self.number, species), 'mol', units)
+        return convert_units(species, self._read('get_activity', species), 'mol', units)
 
     def moles(self, species, units='mmol'):
         """ Returns the moles of a single species """
-        return convert_units(species, self.pp.ip.get_moles(self.number, species), 'mol', units)
+        return convert_units(species, self._read('get_moles', species), 'mol', units)
 
     def molality(self, species, units='mmol'):
         """ Returns the molality of a single species """
-        return convert_units(species, self.pp.ip.get_molality(self.number, species), 'mol', units)
+        return convert_units(species, self._read('get_molality', species), 'mol', units)
 
     def si(self, phase):
         """ return the SI of a certain phase """
-        return self.pp.ip.get_si(self.number, phase)
+        return self._read('get_si', phase)
 
     def sr(self, phase):
         """ return the SI of a certain phase """
-        return 10**self.pp.ip.get_si(self.number, phase)
+        return 10**self._read('get_si', phase)
 
     def forget(self):
         """ remove this solution from VIPhreeqc memory """
@@ -159,114 +239,155 @@ class Solution(object):
         
 
     def kinetics(self, element, rate_function, time, m0=0, args=(), units='mmol'):
-        try:
-            from scipy.integrate import odeint
-        except ImportError as exc:
-            raise ImportError(
-                "kinetics requires scipy. Install with "
-                "'pip install phreeqpython[kinetics]' or install scipy manually."
-            ) from exc
+        require_scipy()
 
-        def calc_rate(y, t, m0, *args):
-            temp = self.copy()
-            temp.add(element, y[0])
-            rate = rate_function(temp, y[0], m0, *args)
-            temp.forget()
-            return rate
-
-        y = odeint(calc_rate, 0, time, args=(m0,)+args)
+        solver = KineticsSolver(self, element, rate_function, m0, args)
+        try:
+            y = solver.odeint(time)
+        finally:
+            solver.close()
 
-        y = np.insert(np.diff(y[:,0]), 0, 0)
+        y = np.insert(np.diff(y), 0, 0)
 
         for i in range(len(time)):
             t = time[i]
             self.add(element, y[i], units)
             yield(t, self)
 
+    def solve_kinetics(self, element, rate_function, time, m0=0, args=(), method='LSODA',
+                       events=None, apply=True, **options):
+        """ Integrate a kinetic reaction with scipy's solve_ivp and return a
+        KineticsResult. Unless apply is False, the amount reacted at the last
+        time is added to the solution """
+        require_scipy()
+
+        solver = KineticsSolver(self, element, rate_function, m0, args)
+        try:
+            result = solver.solve(time, method, events, **options)
+        finally:
+            solver.close()
+
+        if apply:
+            self.add(element, result.y[-1])
+        return result
+
     # Magic functions
     def __add__(self, other):
         """ add two solutions """
         if not isinstance(other,Solution):
             raise TypeError("Invalid operation, only addition of two solutions is allowed")
-        mixture= {self:self.factor, other:other.factor}
-        #print mixture
-        mixture = self.pp.mix_solutions({self:self.factor,other:other.factor})
-        # reset factors to 1
-        self.factor = 1
-        other.factor = 1
-
-        return mixture
+        return self.pp.mix_solutions({self:self.factor,other:other.factor})
 
     def __truediv__(self, other):
         """ Python 3 support """
         return self.__div__(other)
 
     def __div__(self, other):
-        """ set devision factor """
+        """ Returns a new handle to this solution with a division factor """
         if not isinstance(other,numbers.Real):
             raise TypeError("Invalid operation, only division by a number is allowed")
-        self.factor = 1/float(other)
-        return self
+        return self._with_factor(1/float(other))
 
     def __mul__(self, other):
-        """ set multiplication factor """
+        """ Returns a new handle to this solution with a multiplication factor """
         if not isinstance(other,numbers.Real):
             raise TypeError("Invalid operation, only division by a number is allowed")
-        self.factor = float(other)
-        return self
+        return self._with_factor(float(other))
+
+    def _with_factor(self, factor):
+        # the factor is set on a new handle, so operands are never modified
+        solution = Solution(self.pp, self.number)
+        solution.factor = factor
+        return solution
 
     # Accessor methods
+    def get(self, output):
+        """ Returns a solution property by name (e.g. 'pH'), or the result of a
+        solution method as 'method:argument' (e.g. 'si:Calcite' or 'total:Ca') """
+        name, _, argument = output.partition(':')
+        if argument:
+            if name not in OUTPUT_METHODS:
+                raise ValueError("Unknown output method '%s'" % name)
+            return getattr(self, name)(argument)
+        return getattr(self, name)
+
+    def snapshot(self):
+        """ Returns all scalar properties of the solution as a single record """
+        return self.pp.snapshot([self.number])[0]
+
+    def sweep(self, parameter, values, outputs=('pH',), units='mmol', with_chemical=None):
+        """ Returns outputs for a range of doses of a chemical, temperatures or
+        pH values (see PhreeqPython.sweep), without changing this solution """
+        return self.pp.sweep(self, {parameter: values}, outputs, units, with_chemical)
+
+    def sweep_grid(self, parameters, outputs=('pH',), units='mmol', with_chemical=None):
+        """ Returns outputs for every combination of values of several
+        parameters, as an array with one dimension per parameter """
+        return self.pp.sweep(self, parameters, outputs, units, with_chemical)
+
+    def blend_curve(self, other, fractions, outputs=('pH',), compare=False):
+        """ Returns outputs of blends with increasing fractions of another
+        solution (see PhreeqPython.blend_curve) """
+        return self.pp.blend_curve(self, other, fractions, outputs, compare)
+
     @property
     def I(self):
         """ Solution ionic strength """
-        return self.pp.ip.get_mu(self.number)
+        return self._scalar('I')
     def mu(self):
         """ Solution ionic strength """
         return self.I
     @property
     def pH(self):
         """ Solution pH """
-        return self.pp.ip.get_ph(self.number)
+        return self._scalar('pH')
     @property
     def sc(self):
-        return self.pp.ip.get_sc(self.number)
+        return self._scalar('sc')
     @property
     def temperature(self):
-        return self.pp.ip.get_temperature(self.number)
+        return self._scalar('temperature')
     @property
     def mass(self):
-        return self.pp.ip.get_mass(self.number)
+        return self._scalar('mass')
     @property
     def volume(self):
-        return self.pp.ip.get_volume(self.number)
+        return self._scalar('volume')
     @property
     def density(self):
-        return self.pp.ip.get_density(self.number)
+        return self._scalar('density')
     @property
     def pe(self):
-        return self.pp.ip.get_pe(self.number)
+        return self._scalar('pe')
+    # the cached dicts and arrays are copied, so callers can modify them
     @property
     def phases(self):
-        return self.pp.ip.get_phases_si(self.number)
+        return dict(self._cached('phases', lambda: self._read('get_phases_si')))
     @property
     def elements(self):
-        return self.pp.ip.get_elements_totals(self.number)
+        return dict(self._cached('elements', lambda: self._read('get_elements_totals')))
     @property
     def species(self, units='mmol'):
-        return self.pp.ip.get_species_moles(self.number)
+        return self.species_moles
     @property
     def species_moles(self, units='mmol'):
-        return self.pp.ip.get_species_moles(self.number)
+        return dict(self._cached('species_moles', lambda: self._read('get_species_moles')))
     @property
     def species_molalities(self, units='mmol'):
-        return self.pp.ip.get_species_molalities(self.number)
+        return dict(self._cached('species_molalities', lambda: self._read('get_species_molalities')))
     @property
     def species_activities(self, units='mmol'):
-        return self.pp.ip.get_species_activities(self.number)
+        return dict(self._cached('species_activities', lambda: self._read('get_species_activities')))
+    def species_array(self, quantity='moles'):
+        """ Returns the species names and their moles, molalities or activities
+        as two aligned NumPy arrays """
+        names, values = self._cached('species_array:' + quantity,
+                                     lambda: self._read('get_species_array', quantity))
+        return names.copy(), values.copy()
     @property
     def masters_species(self):
         """ Returns a Phreeqc output like species table """
-        return self.pp.ip.get_masters_species(self.number)
+        return self._read('get_masters_species')
 
     # pretty printing
     def __str__(self):
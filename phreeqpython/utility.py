@@ -1,40 +1,68 @@
+from functools import lru_cache
+
+import numpy as np
 from periodictable import formula as chemform
 
-def convert_units(formula, amount, from_units='mol', to_units='mmol'):
-    if formula == 'F' :
-        formula = 'Ni'
+# formulas that are looked up under another name when calculating molar masses
+FORMULA_OVERRIDES = {
+    'F': 'Ni',
+}
+
+@lru_cache(maxsize=1024)
+def molar_mass(formula):
+    """ Returns the molar mass (g/mol) of a chemical formula """
+    return chemform(FORMULA_OVERRIDES.get(formula, formula)).mass
+
+def conversion_factor(formula, from_units='mol', to_units='mmol'):
+    """ Returns the factor to convert an amount of formula from from_units to
+    to_units, or None if the conversion is not supported """
     if from_units == to_units:
-        return amount
+        return 1
 
     if from_units == 'mol':
         if to_units == 'mmol':
-            return amount*1e3
+            return 1e3
         if to_units == 'mg':
-            return chemform(formula).mass * amount * 1e3
+            return molar_mass(formula) * 1e3
         if to_units == 'ug':
-            return chemform(formula).mass * amount * 1e6
+            return molar_mass(formula) * 1e6
 
     if from_units == 'mmol':
         if to_units == 'mol':
-            return amount * 1e-3
+            return 1e-3
         if to_units == 'mg':
-            return chemform(formula).mass * amount
+            return molar_mass(formula)
         if to_units == 'ug':
-            return chemform(formula).mass * amount * 1e3
+            return molar_mass(formula) * 1e3
 
     if from_units == 'mg':
         if to_units == 'mol':
-            return amount / chemform(formula).mass * 1e-3
+            return 1 / molar_mass(formula) * 1e-3
         if to_units == 'mmol':
-            return amount / chemform(formula).mass
+            return 1 / molar_mass(formula)
         if to_units == 'ug':
-            return amount * 1e3
+            return 1e3
 
     if from_units == 'ug': #micrograms
         if to_units == 'mol':
-            return amount / chemform(formula).mass * 1e-6
+            return 1 / molar_mass(formula) * 1e-6
         if to_units == 'mmol':
-            return amount / chemform(formula).mass * 1e-3
+            return 1 / molar_mass(formula) * 1e-3
         if to_units == 'mg':
-            return amount * 1e-3
+            return 1e-3
+
+def convert_units(formula, amount, from_units='mol', to_units='mmol'):
+    if from_units == to_units:
+        return amount
+
+    factor = conversion_factor(formula, from_units, to_units)
+    if factor is not None:
+        return amount * factor
 
+def convert_units_array(formula, amounts, from_units='mol', to_units='mmol'):
+    """ Converts a NumPy array (or any sequence) of amounts of a single formula """
+    amounts = np.asarray(amounts, dtype=float)
+    factor = conversion_factor(formula, from_units, to_units)
+    if factor is None:
+        raise ValueError("Cannot convert from '%s' to '%s'" % (from_units, to_units))
+    return amounts * factor
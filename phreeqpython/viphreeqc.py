@@ -5,9 +5,17 @@
 This is exchangeable with the COM interface.
 """
 
+import contextlib
 import ctypes
+import io
 import os
+import re
 import sys
+import time
+
+import numpy as np
+
+from .profiler import CallEvent, Profiler
 
 if sys.version_info[0] == 2:
     #pylint: disable-msg=W0622
@@ -19,6 +27,31 @@ if sys.version_info[0] == 2:
     #pylint: enable-msg=W0622
 
 
+# order of the values returned by VIPhreeqc.get_solution_properties
+SOLUTION_PROPERTIES = ('pH', 'pe', 'sc', 'I', 'temperature', 'mass', 'volume',
+                       'density')
+
+# library functions that return the number of errors
+ERROR_COUNT_FUNCTIONS = ('_run_string', '_load_database', '_load_database_string',
+                         '_accumulate_line')
+
+# keywords of definitions and settings that are kept by IPhreeqc after a
+# DELETE -all, i.e. that change the loaded database
+PERSISTENT_KEYWORDS = ('SOLUTION_MASTER_SPECIES', 'SOLUTION_SPECIES', 'PHASES',
+                       'EXCHANGE_MASTER_SPECIES', 'EXCHANGE_SPECIES',
+                       'SURFACE_MASTER_SPECIES', 'SURFACE_SPECIES', 'RATES',
+                       'CALCULATE_VALUES', 'NAMED_EXPRESSIONS', 'ISOTOPES',
+                       'ISOTOPE_ALPHAS', 'ISOTOPE_RATIOS', 'PITZER', 'SIT',
+                       'LLNL_AQUEOUS_MODEL_PARAMETERS', 'GAS_BINARY_PARAMETERS',
+                       'MEAN_GAMMAS', 'KNOBS', 'INCREMENTAL_REACTIONS', 'PRINT',
+                       'SELECTED_OUTPUT', 'USER_PUNCH', 'USER_PRINT', 'USER_GRAPH')
+
+_PERSISTENT_PATTERN = re.compile(
+    r'(?:^|;)[ \t]*(?:{})\b'.format('|'.join(keyword.replace('_', '[ _]')
+                                              for keyword in PERSISTENT_KEYWORDS)),
+    re.IGNORECASE | re.MULTILINE)
+
+
 class VIPhreeqc(object):
     """Wrapper for the VIPhreeqc DLL.
     """
@@ -91,6 +124,15 @@ class VIPhreeqc(object):
                            c_int),
                           ('_get_selected_output_row_count',
                            phreeqc.GetSelectedOutputRowCount, [c_int], c_int),
+                          ('_get_selected_output_string',
+                           phreeqc.GetSelectedOutputString, [c_int],
+                           ctypes.c_char_p),
+                          ('_set_selected_output_string_on',
+                           phreeqc.SetSelectedOutputStringOn, [c_int, c_int],
+                           c_int),
+                          ('_set_current_selected_output_user_number',
+                           phreeqc.SetCurrentSelectedOutputUserNumber,
+                           [c_int, c_int], c_int),
                           ('_get_value', phreeqc.GetSelectedOutputValue,
                            [c_int, c_int, c_int, ctypes.POINTER(VAR)], c_int),
                           ('_load_database', phreeqc.LoadDatabase,
@@ -161,16 +203,86 @@ class VIPhreeqc(object):
                           ('_get_solution_list', phreeqc.GetSolutionList,
                            [c_int], ctypes.c_char_p)
                          ]
+        self._functions = {}
         for name, com_obj, argtypes, restype in method_mapping:
             com_obj.argtypes = argtypes
             com_obj.restype = restype
             setattr(self, name, com_obj)
+            self._functions[name] = com_obj
+        self._hooks = []
+        # set when input with one of the PERSISTENT_KEYWORDS is run
+        self.database_modified = False
         self.var = VAR()
         self.phc_error_count = 0
         self.phc_warning_count = 0
         self.phc_database_error_count = 0
+        self._species_index = {}
         self.id_ = self.create_iphreeqc()
 
+    def add_hook(self, hook):
+        """Call hook(event) with a CallEvent after every call into the
+        library. Calls are only instrumented while hooks are installed.
+        """
+        if not self._hooks:
+            for name, function in self._functions.items():
+                setattr(self, name, self._instrument(name, function))
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook):
+        """Remove a hook installed with add_hook.
+        """
+        self._hooks.remove(hook)
+        if not self._hooks:
+            for name, function in self._functions.items():
+                setattr(self, name, function)
+
+    def clear_hooks(self):
+        """Remove all hooks installed with add_hook.
+        """
+        for hook in list(self._hooks):
+            self.remove_hook(hook)
+
+    @contextlib.contextmanager
+    def profile(self):
+        """Profile the library calls made within the context. Yields a
+        Profiler.
+        """
+        profiler = Profiler()
+        self.add_hook(profiler)
+        try:
+            yield profiler
+        finally:
+            self.remove_hook(profiler)
+
+    def _instrument(self, name, function):
+        """Wrap a library function to report its calls to the hooks.
+        """
+        hooks = self._hooks
+        method = name.lstrip('_')
+        counts_errors = name in ERROR_COUNT_FUNCTIONS
+
+        def instrumented(*args):
+            input_size = 0
+            for arg in args:
+                if isinstance(arg, ctypes.c_char_p):
+                    arg = arg.value
+                if isinstance(arg, bytes):
+                    input_size += len(arg)
+            start = time.perf_counter()
+            try:
+                result = function(*args)
+            except Exception:
+                event = CallEvent(method, start, time.perf_counter() - start, input_size, True)
+                for hook in list(hooks):
+                    hook(event)
+                raise
+            event = CallEvent(method, start, time.perf_counter() - start, input_size,
+                              bool(counts_errors and result))
+            for hook in list(hooks):
+                hook(event)
+            return result
+        return instrumented
+
     @staticmethod
     def raise_ipq_error(error_code):
         """There was an error, raise an exception.
@@ -196,6 +308,7 @@ class VIPhreeqc(object):
     def accumulate_line(self, line):
         """Put line in input buffer.
         """
+        self._check_persistent(line)
         errors = self._accumulate_line(self.id_, bytes(line, 'utf-8'))
         if errors != 0:
             self.raise_string_error(errors)
@@ -356,27 +469,54 @@ class VIPhreeqc(object):
         return self._get_activity(self.id_, solution, bytes(species, 'utf-8'))
     def get_molality(self, solution, species):
         return(self._get_molality(self.id_, solution, bytes(species, 'utf-8')))
+    def get_solution_properties(self, solution):
+        """ Returns pH, pe, sc, mu, temperature, mass, volume and density of a
+        solution as a tuple, in the order of SOLUTION_PROPERTIES """
+        return self.get_solutions_properties([solution])[0]
+    def get_solutions_properties(self, solutions):
+        """ Returns a list of SOLUTION_PROPERTIES tuples, one per solution """
+        id_ = self.id_
+        getters = (self._get_ph, self._get_pe, self._get_sc, self._get_mu,
+                   self._get_temperature, self._get_mass, self._get_volume,
+                   self._get_density)
+        return [tuple([getter(id_, solution) for getter in getters])
+                for solution in solutions]
     def get_species_moles(self, solution):
         """ Returns a list of species and their molarity """
-        species_list = self.get_species(solution)
-        species_moles = {}
-        for species in species_list:
-            species_moles[species] = self.get_moles(solution, species)
-        return species_moles
+        return dict(zip(*self._get_species_values(solution, self._get_moles)))
     def get_species_molalities(self, solution):
         """ Returns a list of species and their molality """
-        species_list = self.get_species(solution)
-        species_moles = {}
-        for species in species_list:
-            species_moles[species] = self.get_molality(solution, species)
-        return species_moles
+        return dict(zip(*self._get_species_values(solution, self._get_molality)))
     def get_species_activities(self, solution):
         """ Returns a list of species and their molality """
-        species_list = self.get_species(solution)
-        species_moles = {}
-        for species in species_list:
-            species_moles[species] = self.get_activity(solution, species)
-        return species_moles
+        return dict(zip(*self._get_species_values(solution, self._get_activity)))
+
+    def get_species_array(self, solution, quantity='moles'):
+        """ Returns the species names and their moles, molalities or activities
+        as two aligned NumPy arrays """
+        getters = {'moles': self._get_moles, 'molalities': self._get_molality,
+                   'activities': self._get_activity}
+        if quantity not in getters:
+            raise ValueError("Unknown species quantity '%s'" % quantity)
+        names, values = self._get_species_values(solution, getters[quantity])
+        return np.array(names), np.array(values, dtype=float)
+
+    def get_species_index(self, solution):
+        """ Returns the species of a solution as a tuple of names and a tuple
+        of utf-8 encoded names. The parsed lists are cached on the raw species
+        string, so every distinct species list is only parsed once per database """
+        raw = self._get_species(self.id_, solution)
+        index = self._species_index.get(raw)
+        if index is None:
+            names = tuple(raw.decode('utf-8').split(","))
+            index = (names, tuple(bytes(name, 'utf-8') for name in names))
+            self._species_index[raw] = index
+        return index
+
+    def _get_species_values(self, solution, getter):
+        id_ = self.id_
+        names, encoded_names = self.get_species_index(solution)
+        return names, [getter(id_, solution, name) for name in encoded_names]
 
     def get_species_masters(self, solution):
         """ Returns a dict of species and their masters """
@@ -400,19 +540,25 @@ class VIPhreeqc(object):
         solution_list = self._get_solution_list(self.id_).decode('utf-8').split(",")
         return [int(s) for s in solution_list if isinstance(s, str) and len(s)>0]
     def get_species(self, solution):
-        return self._get_species(self.id_, solution).decode('utf-8').split(",")
+        return list(self.get_species_index(solution)[0])
     def get_si(self, solution, phase):
         return self._get_si(self.id_, solution, bytes(phase, 'utf-8'))
     def get_phases(self, solution):
-        # no idea why this is necessary.. it won't work otherwise
-        return self.dll.GetPhases(self.id_, solution).decode('utf-8').split(",")
+        return self._get_phases(self.id_, solution).decode('utf-8').split(",")
     def get_phases_si(self, solution):
         """ Returns a list of phases and their solubility index """
         phases = self.get_phases(solution)
-        phases_si = {}
-        for phase in phases:
-            phases_si[phase] = self.get_si(solution, phase)
-        return phases_si
+        return dict(zip(phases, self.get_si_matrix([solution], phases)[0].tolist()))
+    def get_si_matrix(self, solutions, phases):
+        """ Returns the saturation index of every phase in every solution as a
+        2-D NumPy array of shape (len(solutions), len(phases)) """
+        id_ = self.id_
+        get_si = self._get_si
+        encoded_phases = [bytes(phase, 'utf-8') for phase in phases]
+        si = np.empty((len(solutions), len(phases)))
+        for row, solution in enumerate(solutions):
+            si[row] = [get_si(id_, solution, phase) for phase in encoded_phases]
+        return si
     def get_elements(self, solution):
         return self._get_elements(self.id_, solution).decode('utf-8').split(",")
 
@@ -498,19 +644,60 @@ class VIPhreeqc(object):
         """
         self._set_selected_output_file_on(self.id_, 1)
 
+    def set_selected_output_string_off(self):
+        """Turn off keeping the current selected output as a string.
+        """
+        self._set_selected_output_string_on(self.id_, 0)
+
+    def set_selected_output_string_on(self):
+        """Turn on keeping the current selected output as a string.
+        """
+        self._set_selected_output_string_on(self.id_, 1)
+
+    def set_current_selected_output_user_number(self, number):
+        """Select the SELECTED_OUTPUT block read by the selected output
+        methods.
+        """
+        error_code = self._set_current_selected_output_user_number(self.id_, number)
+        if error_code < 0:
+            self.raise_ipq_error(error_code)
+
+    def get_selected_output_string(self):
+        """Get the current selected output as a tab separated string.
+        """
+        return self._get_selected_output_string(self.id_).decode('utf-8')
+
+    def get_selected_output_table(self):
+        """Get the headings and all values of the current selected output as
+        a 2-D NumPy array, parsed from the selected output string in bulk. The
+        selected output string must be on and all values must be numbers.
+        """
+        headings, _, values = self._get_selected_output_string(self.id_).partition(b'\n')
+        headings = [h.strip() for h in headings.decode('utf-8').split('\t') if h.strip()]
+        if not values.strip():
+            return headings, np.empty((0, len(headings)))
+        return headings, np.loadtxt(io.BytesIO(values), delimiter='\t',
+                                    usecols=range(len(headings)), ndmin=2)
+
     def load_database(self, database_name):
         """Load a database with given file_name.
         """
         # ensure string
         database_name = str(database_name)
+        self._species_index = {}
+        self.database_modified = False
         self.phc_database_error_count = self._load_database(
             self.id_, bytes(database_name, 'utf-8'))
 
     def load_database_string(self, input_string):
         """Load a datbase from a string.
         """
+        self._species_index = {}
+        self.database_modified = False
+        if not isinstance(input_string, bytes):
+            input_string = bytes(input_string, 'utf-8')
         self.phc_database_error_count = self._load_database_string(
-            self.id_, ctypes.c_char_p(bytes(input_string, 'utf-8')))
+            self.id_, ctypes.c_char_p(input_string))
 
     @property
     def row_count(self):
@@ -524,12 +711,20 @@ class VIPhreeqc(object):
         # print(cmd_string)
         if self.debug:
             print(cmd_string)
+        self._check_persistent(cmd_string)
 
         errors = self._run_string(self.id_,
                                   ctypes.c_char_p(bytes(cmd_string, 'utf-8')))
         if errors != 0:
             self.raise_string_error(errors)
 
+    def _check_persistent(self, input_string):
+        """Mark the database as modified if input_string contains one of the
+        PERSISTENT_KEYWORDS.
+        """
+        if not self.database_modified and _PERSISTENT_PATTERN.search(input_string):
+            self.database_modified = True
+
 
 class VARUNION(ctypes.Union):
     # pylint: disable-msg=R0903
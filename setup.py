@@ -102,6 +102,8 @@ setup(
     install_requires=["periodictable", "numpy"],
     extras_require={
         "kinetics": ["scipy"],
+        "benchmark": ["pytest-benchmark"],
+        "pandas": ["pandas"],
     },
     cmdclass=cmdclass,
     distclass=BinaryDistribution,
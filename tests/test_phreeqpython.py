@@ -1,4 +1,9 @@
-from phreeqpython import PhreeqPython, utility
+import asyncio
+import gc
+import sys
+import threading
+import numpy as np
+from phreeqpython import PhreeqPython, PhreeqPool, EnginePool, AsyncPhreeqPython, utility
 from pathlib import Path
 import pytest
 
@@ -266,3 +271,742 @@ class TestPhreeqPython:
         assert sol4.extraneous['A'] == 0.5
         assert sol4.extraneous['D']['E'] == 1.5
         assert sol4.extraneous['D']['F'] == 1
+
+    def test14_snapshot(self):
+        sol1 = self.pp.add_solution_simple({'CaCl2':1, 'Na2CO3':1})
+        sol2 = self.pp.add_solution_simple({'NaCl':1})
+
+        record = sol1.snapshot()
+        assert record['pH'] == pytest.approx(sol1.pH, abs=1e-9)
+        assert record['sc'] == pytest.approx(sol1.sc, abs=1e-9)
+        assert record['I'] == pytest.approx(sol1.I, abs=1e-9)
+        assert record['density'] == pytest.approx(sol1.density, abs=1e-9)
+
+        records = self.pp.snapshot([sol1, sol2])
+        assert len(records) == 2
+        assert records['temperature'] == pytest.approx([25, 25], abs=1e-2)
+        assert records[1]['mass'] == pytest.approx(sol2.mass, abs=1e-9)
+
+    def test15_species_array(self):
+        sol = self.pp.add_solution_simple({'CaCl2':1, 'Na2CO3':1})
+
+        names, moles = sol.species_array()
+        assert len(names) == len(moles)
+        assert dict(zip(names, moles)) == pytest.approx(sol.species_moles)
+
+        names, activities = sol.species_array('activities')
+        index = list(names).index('Ca+2')
+        assert activities[index] == pytest.approx(0.00054, abs=1e-5)
+
+        with pytest.raises(ValueError):
+            sol.species_array('fugacities')
+
+    def test16_si_matrix(self):
+        sol1 = self.pp.add_solution_simple({'CaCl2':1, 'Na2CO3':1})
+        sol2 = self.pp.add_solution_simple({'CaCl2':1, 'Na2CO3':2})
+
+        si = si_both = self.pp.si_matrix([sol1, sol2], ['Calcite', 'Aragonite'])
+        assert si.shape == (2, 2)
+        assert si[0, 0] == pytest.approx(1.71, abs=1e-2)
+        assert si[1, 1] == pytest.approx(sol2.si('Aragonite'), abs=1e-9)
+
+        si = self.pp.si_matrix([sol1])
+        assert si.shape == (1, len(sol1.phases))
+
+        # a single phase, or any sequence of phases
+        assert self.pp.si_matrix([sol1, sol2], 'Calcite').shape == (2, 1)
+        for phases in [('Calcite', 'Aragonite'), np.array(['Calcite', 'Aragonite'])]:
+            assert self.pp.si_matrix([sol1, sol2], phases) == pytest.approx(si_both, abs=1e-9)
+
+    def test17_batch(self):
+        with self.pp.batch() as batch:
+            sol1 = self.pp.add_solution_simple({'NaCl':1})
+            sol2 = self.pp.add_solution_simple({'CaCl2':1})
+            sol3 = self.pp.mix_solutions({sol1:0.5, sol2:0.5})
+            sol1.add('NaCl', 1)
+            sol2.change_temperature(10)
+            assert len(batch) == 5
+
+        assert sol1.total('Na') == pytest.approx(2, abs=1e-4)
+        assert sol2.temperature == pytest.approx(10, abs=1e-9)
+        assert sol3.total('Na') == pytest.approx(0.5, abs=1e-4)
+        assert sol3.total('Ca') == pytest.approx(0.5, abs=1e-4)
+
+        # operations are discarded when the batch raises
+        with pytest.raises(KeyError):
+            with self.pp.batch():
+                sol1.add('NaCl', 1)
+                raise KeyError()
+        assert sol1.total('Na') == pytest.approx(2, abs=1e-4)
+
+        with pytest.raises(RuntimeError):
+            with self.pp.batch():
+                with self.pp.batch():
+                    pass
+
+    def test18_pool(self):
+        compositions = [{'CaCl2':1, 'Na2CO3':1}, {'NaCl':1}, {'NaCl':2}]
+
+        with PhreeqPool(processes=2) as pool:
+            results = pool.map(compositions, outputs=['pH', 'sc', 'si:Calcite'])
+            assert results[0]['pH'] == pytest.approx(10.41, abs=1e-2)
+            assert results[0]['si:Calcite'] == pytest.approx(1.71, abs=1e-2)
+
+            array = pool.map(compositions, outputs=['sc'], as_array=True)
+            assert array['sc'] == pytest.approx([r['sc'] for r in results], abs=1e-9)
+
+            unordered = dict(pool.imap(compositions, outputs=['sc'], ordered=False))
+            assert [unordered[i]['sc'] for i in range(3)] == pytest.approx(array['sc'], abs=1e-9)
+
+        sol = self.pp.add_solution_simple({'NaCl':1})
+        assert sol.get('total:Na') == pytest.approx(1, abs=1e-4)
+        with pytest.raises(ValueError):
+            sol.get('forget:Na')
+
+    def test19_engine_pool(self):
+        def calculate(pp, composition):
+            sol = pp.add_solution_simple(composition)
+            ph = sol.pH
+            sol.forget()
+            return ph
+
+        compositions = [{'CaCl2':1, 'Na2CO3':1}, {'NaCl':1}] * 10
+
+        with EnginePool(4) as pool:
+            results = pool.map(calculate, compositions)
+            assert results[0] == pytest.approx(10.41, abs=1e-2)
+            assert results[::2] == pytest.approx([results[0]] * 10, abs=1e-9)
+
+            with pool.checkout() as pp:
+                # nested checkouts within a thread return the same engine
+                with pool.checkout() as pp2:
+                    assert pp is pp2
+                with pool.checkout(pp, timeout=0) as pp3:
+                    assert pp is pp3
+
+    def test20_database_cache(self):
+        pp1 = PhreeqPython()
+        sol = pp1.add_solution_simple({'NaCl':1})
+        ip = pp1.ip
+        pp1.close()
+
+        # the released instance is emptied and reused
+        with PhreeqPython() as pp2:
+            assert pp2.ip is ip
+            assert pp2.get_solution_list() == []
+            sol = pp2.add_solution_simple({'CaCl2':1, 'Na2CO3':1})
+            assert sol.number == 0
+            assert sol.pH == pytest.approx(10.41, abs=1e-2)
+
+        # instances with a modified database are not reused
+        pp3 = PhreeqPython()
+        pp3.add_species("Na+ + Cl- = NaCl", log_k=-0.5)
+        ip = pp3.ip
+        pp3.close()
+        with PhreeqPython() as pp4:
+            assert pp4.ip is not ip
+
+        # neither are instances with database input run directly
+        pp5 = PhreeqPython()
+        pp5.ip.run_string("SOLUTION_MASTER_SPECIES\nUrg Urg+2 0 1 1\n"
+                          "SOLUTION_SPECIES\nUrg+2 = Urg+2\nlog_k 0\nEND\n")
+        ip = pp5.ip
+        pp5.close()
+        with PhreeqPython() as pp6:
+            assert pp6.ip is not ip
+
+        # punch and profiling hooks do not prevent reuse, hooks are removed
+        pp7 = PhreeqPython()
+        sol = pp7.add_solution_simple({'NaCl':1})
+        pp7.ip.add_hook(lambda event: None)
+        pp7.punch([sol], ['pH'])
+        ip = pp7.ip
+        pp7.close()
+        with PhreeqPython() as pp8:
+            assert pp8.ip is ip
+            assert pp8.ip._hooks == []
+            assert not pp8.ip.database_modified
+
+    def test21_async(self):
+        async def calculate():
+            async with AsyncPhreeqPython(engines=2, max_pending=2) as app:
+                solutions = await asyncio.gather(*[
+                    app.add_solution_simple({'CaCl2':1, 'Na2CO3':1}) for _ in range(6)
+                ])
+                phs = await asyncio.gather(*[app.get(sol, 'pH') for sol in solutions])
+                assert phs == pytest.approx([10.41] * 6, abs=1e-2)
+
+                sol1 = await app.add_solution_simple({'NaCl':1})
+                sol2 = await app.add_solution_simple({}, engine=sol1.pp)
+                mixture = await app.mix_solutions({sol1:0.5, sol2:0.5})
+                assert await app.get(mixture, 'total:Na') == pytest.approx(0.5, abs=1e-4)
+
+                await app.equalize_solution(solutions[0], 'Calcite', 0)
+                assert await app.get(solutions[0], 'si:Calcite') == pytest.approx(0, abs=1e-6)
+
+        asyncio.run(calculate())
+
+    def test22_kinetics(self):
+        def rate(sol, dissolved, m0):
+            return -0.1 * sol.si('Calcite')
+
+        time = np.linspace(0, 10, 11)
+
+        sol1 = self.pp.add_solution_simple({'NaCl':1})
+        for t, sol in sol1.kinetics('CaCO3', rate, time):
+            pass
+
+        sol2 = self.pp.add_solution_simple({'NaCl':1})
+        result = sol2.solve_kinetics('CaCO3', rate, time, method='BDF')
+        assert result.y[-1] == pytest.approx(sol1.total('Ca'), rel=1e-2)
+        assert sol2.total('Ca') == pytest.approx(sol1.total('Ca'), rel=1e-2)
+        assert result.evaluations == len(result.evaluation_times)
+
+        # stop at an event
+        def half_saturated(t, y):
+            return y[0] - 0.5 * result.y[-1]
+        half_saturated.terminal = True
+        sol3 = self.pp.add_solution_simple({'NaCl':1})
+        result = sol3.solve_kinetics('CaCO3', rate, time, events=half_saturated, apply=False)
+        assert len(result.t_events[0]) == 1
+        assert result.t[-1] < time[-1]
+        assert sol3.total('Ca') == 0
+
+        # a missing scipy is reported the same way by all kinetics methods
+        with pytest.MonkeyPatch.context() as monkeypatch:
+            monkeypatch.setitem(sys.modules, 'scipy', None)
+            with pytest.raises(ImportError, match='requires scipy'):
+                next(sol3.kinetics('CaCO3', rate, time))
+            with pytest.raises(ImportError, match='requires scipy'):
+                sol3.solve_kinetics('CaCO3', rate, time)
+            with pytest.raises(ImportError, match='requires scipy'):
+                self.pp.kinetics([sol3], 'CaCO3', rate, time)
+
+    def test23_batch_kinetics(self):
+        def rate(sol, dissolved, m0):
+            return -0.1 * sol.si('Calcite')
+
+        time = np.linspace(0, 10, 11)
+        solutions = [self.pp.add_solution_simple({'NaCl':1}),
+                     self.pp.add_solution_simple({'NaCl':1, 'CaCl2':1})]
+
+        y = self.pp.kinetics(solutions, 'CaCO3', rate, time, apply=True)
+        assert y.shape == (2, 11)
+
+        single = self.pp.add_solution_simple({'NaCl':1})
+        result = single.solve_kinetics('CaCO3', rate, time)
+        assert y[0] == pytest.approx(result.y, rel=1e-2, abs=1e-4)
+        assert solutions[0].total('Ca') == pytest.approx(y[0, -1], rel=1e-4)
+        assert solutions[1].total('Ca') == pytest.approx(1 + y[1, -1], rel=1e-4)
+
+    def test24_stream(self):
+        rows = ({'CaCl2':1, 'Na2CO3':i % 3} for i in range(25))
+        counter = self.pp.solution_counter
+        solution_list = self.pp.get_solution_list()
+
+        records = list(self.pp.stream(rows, ops=[lambda sol: sol.desaturate('Calcite')],
+                                      outputs=['pH', 'si:Calcite', 'total:Ca'], chunksize=10))
+        assert len(records) == 25
+        assert records[0]['total:Ca'] == pytest.approx(1, abs=1e-4)
+        assert records[1]['si:Calcite'] == pytest.approx(0, abs=1e-6)
+        assert records[4]['total:Ca'] == pytest.approx(records[1]['total:Ca'], abs=1e-9)
+
+        # solutions and numbers are released
+        assert self.pp.solution_counter == counter
+        assert self.pp.get_solution_list() == solution_list
+
+        sol = self.pp.add_solution_simple({'CaCl2':1, 'Na2CO3':1})
+        extracted = self.pp.extract([sol], ['pH', 'sc', 'si:Calcite', 'total:Ca'])
+        assert extracted[0]['sc'] == pytest.approx(435.81, abs=1e-2)
+        assert extracted[0]['si:Calcite'] == pytest.approx(1.71, abs=1e-2)
+        assert extracted[0]['total:Ca'] == pytest.approx(1, abs=1e-4)
+
+    def test25_reclamation(self):
+        pp = PhreeqPython(reclaim=True)
+        sol1 = pp.add_solution_simple({'NaCl':1})
+        sol1.add('NaCl', 1)
+        for _ in range(10):
+            sol2 = sol1.copy()
+            sol2.add('NaCl', 1)
+        del sol2
+        gc.collect()
+
+        # unreferenced copies are deleted when new numbers are allocated
+        stats = pp.memory_stats()
+        assert stats['pending'] > 0
+        assert stats['solutions'] < 11
+
+        pp.collect()
+        stats = pp.memory_stats()
+        assert stats['solutions'] == 1
+        assert stats['pending'] == 0
+        # all numbers above sol1 are returned to the counter
+        assert stats['solution_counter'] == 0
+        assert sol1.total('Na') == pytest.approx(2, abs=1e-4)
+
+        # numbers are reused
+        sol3 = sol1 + sol1
+        assert sol3.number == 1
+        assert sol3.total('Na') == pytest.approx(2, abs=1e-4)
+
+        gas = pp.add_gas({'CO2(g)': 1})
+        gas.copy()
+        gc.collect()
+        pp.collect()
+        assert pp.memory_stats()['gas_counter'] == 0
+        pp.close()
+
+    def test26_checkpoint(self, tmp_path):
+        pp = PhreeqPython()
+        sol1 = pp.add_solution_simple({'CaCl2':1, 'Na2CO3':1})
+        sol1.extraneous = {'source': 'well 1'}
+        sol2 = pp.add_solution_simple({'NaCl':2})
+        pp.add_gas({'CO2(g)': 1})
+
+        for compresslevel in (0, 6):
+            for results in (True, False):
+                filename = str(tmp_path / ('checkpoint%d%d' % (compresslevel, results)))
+                pp.save_checkpoint(filename, compresslevel=compresslevel, results=results)
+                pp2 = PhreeqPython(from_checkpoint=filename)
+
+                assert pp2.solution_counter == pp.solution_counter
+                assert pp2.gas_counter == pp.gas_counter
+                # all loaded solutions are speciated on first use
+                assert pp2._stale == {sol1.number, sol2.number}
+                sol1b = pp2.get_solution(sol1.number)
+                assert sol1b.extraneous == {'source': 'well 1'}
+                assert sol1b.sc == pytest.approx(sol1.sc, abs=1e-6)
+                assert sol1b.si('Calcite') == pytest.approx(sol1.si('Calcite'), abs=1e-6)
+                assert pp2.get_solution(sol2.number).total('Cl') == pytest.approx(2, abs=1e-6)
+                # new solutions do not overwrite the loaded ones
+                assert pp2.add_solution_simple({'NaCl':1}).number == sol2.number + 1
+                pp2.close()
+
+        # the state cannot be replaced while input is queued in a batch
+        with pytest.raises(RuntimeError):
+            with pp.batch():
+                pp.load_checkpoint(filename)
+        with pytest.raises(RuntimeError):
+            with pp.batch():
+                pp.clear()
+        assert pp.get_solution(sol2.number).total('Cl') == pytest.approx(2, abs=1e-6)
+        pp.close()
+
+    def test27_lazy_load(self, tmp_path):
+        pp = PhreeqPython()
+        sol1 = pp.add_solution_simple({'CaCl2':1, 'Na2CO3':1})
+        sol2 = pp.add_solution_simple({'NaCl':2})
+        filename = str(tmp_path / 'dump.gz')
+        pp.dump_solutions(filename=filename)
+
+        pp2 = PhreeqPython(from_file=filename)
+        assert pp2.solution_counter == sol2.number
+        assert pp2._stale == {sol1.number, sol2.number}
+        # only the solution that is used gets calculated
+        assert pp2.get_solution(sol1.number).sc == pytest.approx(sol1.sc, abs=1e-6)
+        assert pp2._stale == {sol2.number}
+        pp2.recalculate()
+        assert not pp2._stale
+        assert pp2.get_solution(sol2.number).total('Cl') == pytest.approx(2, abs=1e-6)
+        pp2.close()
+
+        pp3 = PhreeqPython(from_file=filename, lazy=False)
+        assert not pp3._stale
+        assert pp3.si_matrix([sol1.number], ['Calcite'])[0, 0] == pytest.approx(sol1.si('Calcite'), abs=1e-6)
+        pp3.close()
+        pp.close()
+
+    def test28_result_cache(self):
+        pp = PhreeqPython(result_cache=2)
+        sol1 = pp.add_solution_simple({'CaCl2':1, 'Na2CO3':1})
+        sol2 = pp.add_solution_simple({'Na2CO3':1, 'CaCl2':1})
+        assert sol2.number != sol1.number
+        assert sol2.sc == pytest.approx(sol1.sc, abs=1e-9)
+        assert pp.result_cache_info().hits == 1
+
+        # changing a copy does not change the cached solution
+        sol2.add('NaCl', 1)
+        sol3 = pp.add_solution_simple({'CaCl2':1, 'Na2CO3':1})
+        assert sol3.sc == pytest.approx(sol1.sc, abs=1e-9)
+
+        # mixtures are dropped when one of their parents changes
+        sol4 = pp.add_solution_simple({'NaCl':1})
+        mix1 = sol1 + sol4
+        mix2 = sol1 + sol4
+        assert mix2.total('Na') == pytest.approx(mix1.total('Na'), abs=1e-9)
+        hits = pp.result_cache_info().hits
+        sol4.add('NaCl', 1)
+        mix3 = sol1 + sol4
+        assert pp.result_cache_info().hits == hits
+        assert mix3.total('Cl') == pytest.approx(4, abs=1e-6)
+
+        # least recently used entries are evicted
+        info = pp.result_cache_info()
+        assert info.currsize == info.maxsize == 2
+        assert pp.memory_stats()['solutions'] == 9
+
+        pp.clear_result_cache()
+        assert pp.result_cache_info().currsize == 0
+        assert pp.memory_stats()['solutions'] == 7
+        pp.close()
+
+    def test29_property_cache(self):
+        pp = PhreeqPython()
+        sol = pp.add_solution_simple({'CaCl2':1, 'Na2CO3':1})
+        version = sol.version
+        pH = sol.pH
+        phases = sol.phases
+
+        # cached reads do not call into VIPhreeqc
+        calls = []
+        get_ph = pp.ip._get_ph
+        pp.ip._get_ph = lambda id_, number: calls.append(number) or get_ph(id_, number)
+        assert sol.pH == pH
+        assert pp.get_solution(sol.number).pH == pH
+        assert not calls
+        # returned dicts are copies
+        sol.phases.clear()
+        assert sol.phases == phases
+
+        sol.add('HCl', 1)
+        assert sol.version > version
+        assert sol.pH < pH
+        assert calls == [sol.number]
+        assert sol.species_moles['H+'] == pytest.approx(sol.species_array()[1][
+            list(sol.species_array()[0]).index('H+')], abs=1e-12)
+        pp.ip._get_ph = get_ph
+
+        # a value read before a change from another thread is not cached
+        sol = pp.add_solution_simple({'NaCl':1})
+        reading, proceed = threading.Event(), threading.Event()
+        get_sc = pp.ip._get_sc
+        def slow_get_sc(id_, number):
+            value = get_sc(id_, number)
+            reading.set()
+            proceed.wait(5)
+            return value
+        pp.ip._get_sc = slow_get_sc
+        reader = threading.Thread(target=lambda: sol.sc)
+        reader.start()
+        reading.wait(5)
+        pp.ip._get_sc = get_sc
+        writer = threading.Thread(target=sol.add, args=('NaCl', 1))
+        writer.start()
+        writer.join(0.2)
+        proceed.set()
+        reader.join()
+        writer.join()
+        assert sol.sc == pytest.approx(pp.ip.get_sc(sol.number), abs=1e-9)
+        pp.close()
+
+        pp = PhreeqPython(cache_properties=False)
+        sol = pp.add_solution_simple({'NaCl':1})
+        sol.pH
+        assert not pp._property_cache
+        pp.close()
+
+    def test30_sweep(self):
+        pp = PhreeqPython()
+        sol = pp.add_solution_simple({'CaCl2':2, 'NaHCO3':4})
+        pH = sol.pH
+        result = sol.sweep('NaOH', [0, 1, 2], ['pH', 'si:Calcite'])
+        assert result.shape == (3,)
+        for dose, record in zip([0, 1, 2], result):
+            copy = sol.copy().add('NaOH', dose)
+            assert record['pH'] == pytest.approx(copy.pH, abs=1e-9)
+            assert record['si:Calcite'] == pytest.approx(copy.si('Calcite'), abs=1e-9)
+            copy.forget()
+        # the solution itself is not changed
+        assert sol.pH == pH
+
+        result = sol.sweep('pH', [6, 10], ['pH', 'total:Na', 'total:Cl'])
+        assert result['pH'] == pytest.approx([6, 10], abs=1e-6)
+        assert result[0]['total:Cl'] > 4
+        assert result[1]['total:Na'] > 4
+
+        grid = sol.sweep_grid({'NaOH': [0, 1], 'temperature': [10, 40, 60]}, ['temperature'])
+        assert grid.shape == (2, 3)
+        assert grid['temperature'][1] == pytest.approx([10, 40, 60], abs=1e-9)
+        assert pp.memory_stats()['solutions'] == 1
+        pp.close()
+
+    def test31_punch(self):
+        pp = PhreeqPython()
+        sol1 = pp.add_solution_simple({'CaCl2':1, 'NaHCO3':2})
+        sol2 = pp.add_solution_simple({'NaCl':1})
+        outputs = ['pH', 'sc', 'si:Calcite', 'total_element:C', 'moles:HCO3-']
+        result = pp.punch([sol1, sol2], outputs)
+        assert result.shape == (2,)
+        for record, sol in zip(result, [sol1, sol2]):
+            assert record['pH'] == pytest.approx(sol.pH, abs=1e-6)
+            assert record['sc'] == pytest.approx(sol.sc, abs=1e-6)
+            assert record['total_element:C'] == pytest.approx(sol.total_element('C'), abs=1e-6)
+            assert record['moles:HCO3-'] == pytest.approx(sol.moles('HCO3-'), abs=1e-6)
+        assert result[0]['si:Calcite'] == pytest.approx(sol1.si('Calcite'), abs=1e-6)
+
+        with pytest.raises(ValueError):
+            pp.punch([sol1], ['total:Ca'])
+        # the selected output is deactivated afterwards
+        assert len(pp.punch([], ['pH'])) == 0
+        pp.change_solution(sol2.number, {'NaCl': 0})
+        assert pp.ip.get_selected_output_string() == ''
+
+        pd = pytest.importorskip('pandas')
+        frame = pp.punch([sol1, sol2], ['pH'], as_frame=True)
+        assert isinstance(frame, pd.DataFrame)
+        assert list(frame.index) == [sol1.number, sol2.number]
+        assert frame.loc[sol1.number, 'pH'] == pytest.approx(sol1.pH, abs=1e-6)
+        pp.close()
+
+    def test32_solutions_from_table(self):
+        pp = PhreeqPython()
+        table = np.array([(1., 2., 10.), (0.5, np.nan, 20.), (0., 1., 30.)],
+                         dtype=[('CaCl2', float), ('NaHCO3', float), ('T', float)])
+        collection = pp.add_solutions_from_table(table, units='mmol', temperature_column='T')
+        assert len(collection) == 3
+
+        sol = pp.add_solution_simple({'CaCl2':1, 'NaHCO3':2}, temperature=10)
+        assert collection[0].pH == pytest.approx(sol.pH, abs=1e-9)
+        assert collection[1].total('Na') == pytest.approx(0, abs=1e-9)
+        assert collection[2].temperature == pytest.approx(30, abs=1e-9)
+        assert collection[1:].snapshot()['temperature'] == pytest.approx([20, 30], abs=1e-9)
+        assert [s.number for s in collection] == list(collection.numbers)
+
+        # dict of columns in other units
+        collection = pp.add_solutions_from_table({'NaCl': [58.44, 116.88]}, units='mg', chunksize=1)
+        assert collection.extract(['total:Cl'])['total:Cl'] == pytest.approx([1, 2], abs=1e-3)
+
+        pd = pytest.importorskip('pandas')
+        frame = pd.DataFrame({'CaCl2': [1., 2.], 'NaHCO3': [2., 2.]})
+        collection = pp.add_solutions_from_table(frame)
+        sol = pp.add_solution_simple({'CaCl2':1, 'NaHCO3':2})
+        assert collection[0].sc == pytest.approx(sol.sc, abs=1e-9)
+        pp.close()
+
+    def test33_collection_reclamation(self):
+        pp = PhreeqPython(reclaim=True)
+        collection = pp.add_solutions_from_table({'NaCl': [1, 2, 3]})
+        first = collection[0]
+        del collection
+        gc.collect()
+        pp.collect()
+        # only the solution that is still referenced is kept
+        assert pp.memory_stats()['solutions'] == 1
+        assert first.total('Cl') == pytest.approx(1, abs=1e-6)
+        pp.close()
+
+    def test34_collection_operations(self):
+        pp = PhreeqPython()
+        table = {'CaCl2': [1, 2, 3], 'NaHCO3': [2, 2, 2], 'flow': [10., 20., 30.]}
+        collection = pp.add_solutions_from_table(table, extraneous_columns=['flow'])
+        solutions = [pp.add_solution_simple({'CaCl2': amount, 'NaHCO3': 2}) for amount in [1, 2, 3]]
+
+        assert collection.pH == pytest.approx([s.pH for s in solutions], abs=1e-9)
+        assert collection.sc == pytest.approx([s.sc for s in solutions], abs=1e-9)
+        assert collection.si('Calcite') == pytest.approx([s.si('Calcite') for s in solutions], abs=1e-9)
+        assert collection.total('Ca') == pytest.approx([1, 2, 3], abs=1e-6)
+        assert collection.total_element('Cl', 'mol') == pytest.approx([2e-3, 4e-3, 6e-3], abs=1e-12)
+
+        # extraneous data is columnar, and copied to the solutions that are used
+        assert list(collection[1:].extraneous['flow']) == [20, 30]
+        assert collection[2].extraneous == {'flow': 30}
+        mixture = collection[0] + collection[1]
+        assert mixture.total('Ca') == pytest.approx(3, abs=1e-6)
+        assert mixture.extraneous == {'flow': 30}
+
+        # solutions are lightweight handles
+        assert not hasattr(solutions[0], '__dict__')
+
+        collection.forget()
+        assert collection.pH == pytest.approx([-999] * 3, abs=1e-9)
+        pp.close()
+
+    def test35_mix_many(self):
+        pp = PhreeqPython()
+        sources = [pp.add_solution_simple({'CaCl2':1, 'NaHCO3':2}),
+                   pp.add_solution_simple({'NaCl':2}),
+                   pp.add_solution_simple({'MgSO4':1})]
+        fractions = np.array([[1, 0, 0], [0.5, 0.5, 0], [0.2, 0.3, 0.5]])
+        solutions = pp.get_solution_list()
+
+        result = pp.mix_many(sources, fractions, ['pH', 'sc', 'si:Calcite'])
+        fallback = pp.mix_many(sources, fractions, ['pH', 'total:Cl'])
+        for row, record, other in zip(fractions, result, fallback):
+            mixture = pp.mix_solutions({s: f for s, f in zip(sources, row) if f})
+            assert record['pH'] == pytest.approx(mixture.pH, abs=1e-6)
+            assert record['sc'] == pytest.approx(mixture.sc, abs=1e-6)
+            assert record['si:Calcite'] == pytest.approx(mixture.si('Calcite'), abs=1e-6)
+            assert other['pH'] == pytest.approx(mixture.pH, abs=1e-9)
+            assert other['total:Cl'] == pytest.approx(mixture.total('Cl'), abs=1e-9)
+            mixture.forget()
+        # no temporary mixtures are left behind
+        assert pp.get_solution_list() == solutions
+
+        with pytest.raises(ValueError):
+            pp.mix_many(sources, [[0.5, 0.5]])
+        # mixtures without any non-zero fraction are rejected before mixing
+        with pytest.raises(ValueError):
+            pp.mix_many(sources, [[1, 0, 0], [0, 0, 0]])
+        with pytest.raises(ValueError):
+            pp.mix_many(sources, [[0, 0, 0]], ['pH', 'total:Cl'])
+        with pytest.raises(ValueError):
+            pp.mix_many(sources, [[0.5, np.nan, 0.5]])
+        assert pp.get_solution_list() == solutions
+
+        # factors are set on new handles, the operands are not changed
+        sol1, sol2 = sources[0], sources[1]
+        sol1.extraneous = {'flow': 10}
+        half = sol1 * 0.5
+        assert half is not sol1 and sol1.factor == 1
+        mixture = half + sol2 / 2
+        assert mixture.total('Cl') == pytest.approx(2, abs=1e-6)
+        assert mixture.extraneous == {'flow': 5}
+        # solution numbers can be used as keys
+        mixture = pp.mix_solutions({sol1.number: 0.5, sol2.number: 0.5})
+        assert mixture.extraneous == {'flow': 5}
+        pp.close()
+
+    def test36_blend_curve(self):
+        pp = PhreeqPython()
+        sol1 = pp.add_solution_simple({'CaCl2':3, 'NaHCO3':4, 'MgSO4':1})
+        sol2 = pp.add_solution_simple({'NaOH':5, 'Na2CO3':1})
+        solutions = pp.get_solution_list()
+        fractions = np.linspace(0, 1, 21)
+
+        curve = sol1.blend_curve(sol2, fractions, ['pH', 'si:Calcite'], compare=True)
+        for fraction, pH, si in zip(fractions[:20:5], curve['pH'][:20:5], curve['si:Calcite'][:20:5]):
+            mixture = pp.mix_solutions({sol1: 1 - fraction, sol2: fraction})
+            assert pH == pytest.approx(mixture.pH, abs=1e-6)
+            assert si == pytest.approx(mixture.si('Calcite'), abs=1e-6)
+            mixture.forget()
+        assert curve.iterations.sum() < curve.cold_iterations.sum()
+        assert curve.iterations_saved > 0
+        assert pp.get_solution_list() == solutions
+        assert pp.blend_curve(sol1, sol2, fractions).iterations_saved is None
+
+        with pytest.raises(ValueError):
+            pp.blend_curve(sol1, sol2, [0.5, 0.2])
+        with pytest.raises(ValueError):
+            pp.blend_curve(sol1, sol2, [0.5], ['total:Na'])
+        pp.close()
+
+    def test37_profile(self):
+        pp = PhreeqPython()
+        events = []
+        pp.ip.add_hook(events.append)
+        with pp.profile() as profiler:
+            sol = pp.add_solution_simple({'CaCl2':1, 'NaHCO3':2})
+            sol.pH
+            sol.si('Calcite')
+            with pytest.raises(Exception):
+                pp.ip.run_string("MIX 1\n999 1\nEND\n")
+        pp.ip.remove_hook(events.append)
+
+        stats = profiler.stats
+        assert stats['run_string']['calls'] == 2
+        assert stats['run_string']['errors'] == 1
+        assert stats['run_string']['input_size'] > 0
+        assert stats['get_ph']['calls'] == 1
+        assert profiler.report()[0][0] == 'run_string'
+        assert profiler.total_time > 0
+        assert 'get_si' in str(profiler)
+        assert [event.method for event in events if event.method == 'get_si'] == ['get_si']
+        assert all(event.duration >= 0 for event in events)
+
+        # without hooks the library functions are called directly
+        assert pp.ip._run_string is pp.ip._functions['_run_string']
+        sol.add('NaCl', 1)
+        assert stats['run_string']['calls'] == 2
+        pp.close()
+
+    def test38_reclamation_of_temporary_solutions(self):
+        pp = PhreeqPython(reclaim=True)
+        base = pp.add_solution_simple({'CaCl2': 1})
+        sources = [base, pp.add_solution_simple({'NaCl': 1})]
+        records = list(pp.stream([{'CaCl2': 1}, {'CaCl2': 2}], outputs=['pH', 'total:Ca']))
+        base.sweep('NaOH', [0, 1], ['pH', 'total:Ca'])
+        pp.mix_many(sources, [[0.5, 0.5], [0.2, 0.8]], ['total:Cl'])
+        del records
+        gc.collect()
+
+        solutions = [pp.add_solution_simple({'CaCl2': amount}) for amount in range(1, 7)]
+        gc.collect()
+        pp.collect()
+        numbers = [solution.number for solution in solutions]
+        assert len(set(numbers)) == len(numbers)
+        assert base.number not in numbers and sources[1].number not in numbers
+        assert [s.total('Ca') for s in solutions] == pytest.approx(range(1, 7), abs=1e-6)
+        assert base.total('Ca') == pytest.approx(1, abs=1e-6)
+        pp.close()
+
+    def test39_sweep_with_reclamation(self):
+        pp = PhreeqPython(reclaim=True)
+        base = pp.add_solution_simple({'CaCl2': 1})
+        base.sweep('NaOH', [0, 1, 2, 3], ['pH', 'total:Ca'])
+        gc.collect()
+        # the temporary numbers of the sweep are reused exactly once
+        solutions = [pp.add_solution_simple({'NaCl': amount}) for amount in range(1, 7)]
+        numbers = [solution.number for solution in solutions]
+        assert len(set(numbers)) == len(numbers)
+        assert base.number not in numbers
+        assert [s.total('Cl') for s in solutions] == pytest.approx(range(1, 7), abs=1e-6)
+        pp.close()
+
+    def test40_async_timeout(self):
+        started = threading.Event()
+        release = threading.Event()
+        def block(pp):
+            started.set()
+            release.wait(5)
+
+        async def calculate():
+            async with AsyncPhreeqPython(engines=1, max_pending=1, timeout=0.1) as app:
+                with pytest.raises(asyncio.TimeoutError):
+                    await app.run(block)
+                assert started.is_set()
+                # the timed out call still runs in its thread and keeps its slot
+                assert app._semaphore.locked()
+                release.set()
+                assert await app.run(lambda pp: pp.add_solution_simple({'NaCl':1}).number) >= 0
+
+        asyncio.run(calculate())
+
+    def test41_batch_and_chain_threads(self):
+        pp = PhreeqPython()
+        sol = pp.add_solution_simple({'CaCl2':1, 'Na2CO3':1})
+        results = {}
+        def add_solution():
+            added = pp.add_solution_simple({'CaCl2':1})
+            results['pH'] = added.pH
+            results['Ca'] = added.total('Ca')
+        def read_solution():
+            results['si'] = sol.si('Calcite')
+
+        # operations of other threads wait for a batch instead of joining it
+        with pp.batch() as batch:
+            pp.add_solution_simple({'NaCl':1})
+            threads = [threading.Thread(target=add_solution),
+                       threading.Thread(target=read_solution)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(0.2)
+                assert thread.is_alive()
+            assert len(batch) == 1
+        for thread in threads:
+            thread.join()
+        assert results['pH'] == pytest.approx(7.0, abs=0.1)
+        assert results['Ca'] == pytest.approx(1, abs=1e-6)
+        assert results['si'] == pytest.approx(sol.si('Calcite'), abs=1e-9)
+
+        # and for a chain
+        results.clear()
+        sol.chain()
+        thread = threading.Thread(target=add_solution)
+        thread.start()
+        thread.join(0.2)
+        assert thread.is_alive()
+        sol.end()
+        thread.join()
+        assert results['Ca'] == pytest.approx(1, abs=1e-6)
+        pp.close()
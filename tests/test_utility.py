@@ -1,4 +1,7 @@
-from phreeqpython.utility import convert_units
+import numpy as np
+import pytest
+
+from phreeqpython.utility import convert_units, convert_units_array, molar_mass
 
 class TestUtility:
 
@@ -40,3 +43,17 @@ class TestUtility:
         assert round(
             convert_units('NaOH', 1, from_units='ug', to_units='mg'), 4
         ) == 0.001
+
+    def test_convert_units_array(self):
+        converted = convert_units_array('NaOH', [1, 2], from_units='mmol', to_units='mg')
+        assert converted.round(3).tolist() == [39.997, 79.994]
+        assert convert_units_array('NaOH', np.array([1000.0]), 'mg', 'mg').tolist() == [1000.0]
+
+        with pytest.raises(ValueError):
+            convert_units_array('NaOH', [1], from_units='mol', to_units='ppm')
+
+    def test_molar_mass(self):
+        assert round(molar_mass('NaOH'), 3) == 39.997
+        # formula overrides
+        assert molar_mass('F') == molar_mass('Ni')
+        assert molar_mass.cache_info().currsize > 0